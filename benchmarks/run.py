@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+# The scanner modules live one level up, flat
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import rich
+from treegen import make_tree
+from scanner import (walk_files, build_exclude_matcher, scan_all, find_duplicates, ScanOptions, ScanTally,
+                     _classify, DEFAULT_EXCLUDE_PATTERNS)
+from ghostrules import build_ghost_rules
+from utils import hash_file, export_results, HASH_ALGORITHMS, EXPORT_FORMATS
+
+# Timed scenarios over synthetic trees (see treegen.py), e.g.
+#   python benchmarks/run.py --scale 0.5 --output before.json
+#   python benchmarks/run.py --scale 0.5 --output after.json --compare before.json
+# Every timing is the best of --repeat runs, with the median alongside.
+# Trees are read again and again, so the numbers are warm page cache
+# numbers - they're there to compare code changes, not disks.
+
+# Thresholds the scans run with: low enough that every detector reports
+# plenty on the synthetic trees
+LARGE_THRESHOLD = 64 * 1024
+OLD_THRESHOLD = 365 * 24 * 3600
+
+SCAN_KWARGS = dict(large_threshold=LARGE_THRESHOLD, old_threshold=OLD_THRESHOLD, use_cache=False)
+
+
+def _timed(func, repeat):
+    # [seconds of each run]
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def _records(root):
+    return list(walk_files(root, exclude=build_exclude_matcher()))
+
+
+# --- Scenarios ---
+# Each one is (trees it runs on, func(root, args) -> [(variant, func to time,
+# files, bytes)]); files / bytes are what one call goes through, for rates.
+
+def bench_walk(root, args):
+    exclude = build_exclude_matcher()
+    records = _records(root)
+    return [("", lambda: sum(1 for _ in walk_files(root, exclude=exclude)),
+             len(records), 0)]
+
+
+def bench_exclude(root, args):
+    # The per-entry exclusion check on its own, every name in the tree
+    # against the default patterns
+    exclude = build_exclude_matcher()
+    names = [record.name for record in _records(root)] + DEFAULT_EXCLUDE_PATTERNS
+    return [("", lambda: sum(1 for name in names if exclude.match(name)), len(names), 0)]
+
+
+def bench_classify(root, args):
+    # Ghost / large / old detectors plus the tallies, no I/O: the records
+    # are walked once up front
+    records = _records(root)
+    opts = ScanOptions(scan_ghosts=True, scan_large=True, scan_old=True, scan_duplicates=False,
+                       large_threshold=LARGE_THRESHOLD, old_threshold=OLD_THRESHOLD, large_top=None,
+                       old_time='mtime', ghost_rules=build_ghost_rules())
+    now = time.time()
+
+    def classify():
+        findings = []
+        tally = ScanTally()
+        for record in records:
+            _classify(record, now, opts, findings.append, tally)
+        tally.stats.flush()
+        return findings
+
+    return [("", classify, len(records), sum(r.size for r in records))]
+
+
+def bench_scan(root, args):
+    # scan_all end to end without duplicates (those are bench_duplicates)
+    records = _records(root)
+    variants = [("serial", lambda: scan_all(root, scan_duplicates=False, **SCAN_KWARGS))]
+    if args.processes > 1:
+        variants.append((f"processes={args.processes}",
+                         lambda: scan_all(root, scan_duplicates=False, processes=args.processes, **SCAN_KWARGS)))
+    return [(name, func, len(records), sum(r.size for r in records)) for name, func in variants]
+
+
+def bench_hash(root, args):
+    # hash_file over every file, per algorithm
+    records = _records(root)
+    total = sum(r.size for r in records)
+    variants = []
+    for algo in args.algorithms:
+        variants.append((algo, lambda algo=algo: [hash_file(r.path, algorithm=algo) for r in records],
+                         len(records), total))
+    return variants
+
+
+def bench_duplicates(root, args):
+    # The staged size / partial / full hash search, per algorithm, no cache
+    records = _records(root)
+    total = sum(r.size for r in records)
+    return [(algo, lambda algo=algo: find_duplicates(records, hash_algo=algo, workers=args.jobs),
+             len(records), total)
+            for algo in args.algorithms]
+
+
+def bench_live_ui(root, args):
+    # The full interactive scan with the Live layout repainting, drawn into
+    # /dev/null at a fixed terminal size
+    records = _records(root)
+
+    def live():
+        with open(os.devnull, 'w') as devnull:
+            rich.reconfigure(file=devnull, force_terminal=True, width=160, height=50)
+            try:
+                return scan_all(root, live_ui=True, hash_algo='md5', **SCAN_KWARGS)
+            finally:
+                rich.reconfigure()
+
+    return [("", live, len(records), sum(r.size for r in records))]
+
+
+def bench_export(root, args):
+    # Every export format, from one full scan of the tree
+    results = scan_all(root, hash_algo='md5', **SCAN_KWARGS)
+    rows = len(results["ghosts"]) + len(results["large"]) + len(results["old"])
+    # next to the trees, so it goes away with them
+    out_dir = os.path.join(os.path.dirname(root), 'export')
+    os.makedirs(out_dir, exist_ok=True)
+
+    def export(fmt):
+        path = export_results(results, fmt, os.path.join(out_dir, 'report'))
+        os.remove(path)
+
+    return [(fmt, lambda fmt=fmt: export(fmt), rows, 0) for fmt in EXPORT_FORMATS]
+
+
+SCENARIOS = {
+    'walk': (('wide', 'deep', 'tiny'), bench_walk),
+    'exclude': (('wide', 'tiny'), bench_exclude),
+    'classify': (('wide', 'deep', 'tiny'), bench_classify),
+    'scan': (('wide', 'deep', 'tiny'), bench_scan),
+    'hash': (('huge', 'dupes'), bench_hash),
+    'duplicates': (('dupes',), bench_duplicates),
+    'live_ui': (('wide',), bench_live_ui),
+    'export': (('wide',), bench_export),
+}
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _key(result):
+    return (result["scenario"], result["tree"], result["variant"])
+
+
+def compare(results, baseline_path):
+    # Prints how every timing moved against an earlier --output file
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {_key(result): result for result in json.load(f)["results"]}
+    print(f"\nAgainst {baseline_path} (best times, < 1.00x is faster):")
+    for result in results:
+        old = baseline.get(_key(result))
+        if old is None:
+            continue
+        ratio = result["best"] / old["best"] if old["best"] else float('inf')
+        label = " ".join(part for part in _key(result) if part)
+        print(f"  {label:40s} {old['best']:9.4f}s -> {result['best']:9.4f}s  {ratio:5.2f}x")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="GhostyDisk benchmarks on synthetic trees")
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help=f"What to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument('--scale', type=float, default=1.0, help='Tree size multiplier')
+    parser.add_argument('--seed', type=int, default=0, help='Tree generator seed')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per timing')
+    parser.add_argument('--algorithms', type=str, default=','.join(HASH_ALGORITHMS),
+                        help='Hash algorithms to time, comma separated')
+    parser.add_argument('--jobs', type=int, default=1, help='Hashing threads for the duplicates scenario')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='Also time the scan with this many processes (1 to skip)')
+    parser.add_argument('--tree-dir', type=str,
+                        help='Build trees here and keep them for the next run (default: a temp dir)')
+    parser.add_argument('--output', type=str, help='Write results as JSON here')
+    parser.add_argument('--compare', type=str, metavar='JSON', help='Compare against an earlier --output')
+    args = parser.parse_args()
+    for scenario in args.scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario: {scenario}")
+    args.algorithms = [algo for algo in args.algorithms.split(',') if algo]
+    for algo in args.algorithms:
+        if algo not in HASH_ALGORITHMS:
+            parser.error(f"unknown hash algorithm: {algo}")
+    return args
+
+
+def main():
+    args = parse_arguments()
+    scenarios = args.scenarios or list(SCENARIOS)
+
+    tree_dir = args.tree_dir or tempfile.mkdtemp(prefix='ghostydisk-bench-')
+    trees = {}
+    results = []
+    try:
+        for scenario in scenarios:
+            shapes, bench = SCENARIOS[scenario]
+            for shape in shapes:
+                root = os.path.join(tree_dir, f"{shape}-{args.scale}-{args.seed}")
+                if shape not in trees:
+                    start = time.perf_counter()
+                    trees[shape] = make_tree(root, shape, args.scale, args.seed)
+                    print(f"[tree] {shape}: {trees[shape]['files']} files, "
+                          f"{trees[shape]['bytes'] / 1024 / 1024:.1f} MB ({time.perf_counter() - start:.1f}s)")
+                for variant, func, files, nbytes in bench(root, args):
+                    runs = _timed(func, args.repeat)
+                    best = min(runs)
+                    result = {
+                        "scenario": scenario,
+                        "tree": shape,
+                        "variant": variant,
+                        "best": best,
+                        "median": statistics.median(runs),
+                        "runs": runs,
+                        "files": files,
+                        "bytes": nbytes,
+                        "files_per_sec": files / best if best else None,
+                        "mb_per_sec": nbytes / 1024 / 1024 / best if best and nbytes else None,
+                    }
+                    results.append(result)
+                    rate = f"{result['files_per_sec']:,.0f} files/s" if result['files_per_sec'] else ""
+                    if result["mb_per_sec"]:
+                        rate += f", {result['mb_per_sec']:,.1f} MB/s"
+                    label = " ".join(part for part in (scenario, shape, variant) if part)
+                    print(f"  {label:40s} {best:9.4f}s  {rate}")
+    finally:
+        if args.tree_dir is None:
+            shutil.rmtree(tree_dir, ignore_errors=True)
+
+    report = {
+        "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scale": args.scale,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "trees": trees,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import random
+
+# Deterministic synthetic trees for the benchmarks. The same shape, scale
+# and seed always give the same names, sizes and contents (mtimes are
+# spread back from the moment of generation, so ages come out the same
+# too). Names stay clear of DEFAULT_EXCLUDE_PATTERNS, so the scanner sees
+# everything that gets written.
+
+MB = 1024 * 1024
+DAY = 24 * 3600
+
+# Written next to the tree; a tree with a matching one is reused as is
+MANIFEST_NAME = '.treegen.json'
+
+# Share of files given a ghost name / an mtime older than a year
+GHOST_RATIO = 0.05
+OLD_RATIO = 0.3
+
+# A few of the default ghost rules, to get some hits out of each kind
+GHOST_SUFFIXES = ('.tmp', '.swp', '~', '.orig', '.rej')
+
+
+class _Writer:
+    # Writes files and keeps count; contents come from one pre-built random
+    # pool, so even huge files cost no more than the write itself
+    def __init__(self, rng, now):
+        self.rng = rng
+        self.now = now
+        self.pool = rng.randbytes(4 * MB)
+        self.files = 0
+        self.bytes = 0
+
+    def content(self, size, seed):
+        # seed picks where in the pool the data starts: equal seeds give
+        # equal contents, different seeds (almost always) different ones
+        start = seed * 7919 % len(self.pool)
+        data = bytearray()
+        while len(data) < size:
+            data += self.pool[start:start + size - len(data)]
+            start = 0
+        return bytes(data)
+
+    def name(self, index, ext='.dat'):
+        if self.rng.random() < GHOST_RATIO:
+            return f"f{index:06d}{self.rng.choice(GHOST_SUFFIXES)}"
+        return f"f{index:06d}{ext}"
+
+    def write(self, path, size, seed=None, data=None):
+        seed = self.files if seed is None else seed
+        with open(path, 'wb') as f:
+            if data is not None:
+                f.write(data)
+            else:
+                # big files go out in pool sized pieces
+                left = size
+                while left:
+                    piece = min(left, len(self.pool))
+                    f.write(self.content(piece, seed))
+                    left -= piece
+        if self.rng.random() < OLD_RATIO:
+            age = self.rng.uniform(365, 5 * 365) * DAY
+        else:
+            age = self.rng.uniform(0, 365) * DAY
+        os.utime(path, (self.now - age, self.now - age))
+        self.files += 1
+        self.bytes += size
+
+
+def _wide(root, w, scale):
+    # Few levels, lots of entries per directory
+    index = 0
+    for d in range(max(1, int(20 * scale))):
+        parent = os.path.join(root, f"d{d:03d}")
+        os.makedirs(parent)
+        for _ in range(500):
+            w.write(os.path.join(parent, w.name(index)), w.rng.randint(0, 16 * 1024))
+            index += 1
+
+
+def _deep(root, w, scale):
+    # Long chains of nested directories, a few files at every level
+    index = 0
+    for chain in range(max(1, int(10 * scale))):
+        parent = os.path.join(root, f"c{chain:03d}")
+        for level in range(100):
+            parent = os.path.join(parent, f"l{level:03d}")
+            os.makedirs(parent)
+            for _ in range(4):
+                w.write(os.path.join(parent, w.name(index)), w.rng.randint(0, 8 * 1024))
+                index += 1
+
+
+def _dupes(root, w, scale):
+    # Many duplicate groups, plus same-size files that only differ past the
+    # partial hash head / tail, which the full hash has to tell apart
+    sizes = [w.rng.randint(8 * 1024, 256 * 1024) for _ in range(100)]
+    index = 0
+    for d in range(max(1, int(10 * scale))):
+        parent = os.path.join(root, f"d{d:03d}")
+        os.makedirs(parent)
+        for _ in range(200):
+            blob = w.rng.randrange(len(sizes))
+            path = os.path.join(parent, w.name(index))
+            if w.rng.random() < 0.2:
+                # same size as the blob, same head and tail, different middle
+                data = bytearray(w.content(sizes[blob], blob))
+                data[len(data) // 2] ^= 0xff
+                w.write(path, len(data), data=data)
+            else:
+                w.write(path, sizes[blob], seed=blob)
+            index += 1
+
+
+def _huge(root, w, scale):
+    # A handful of big files, two of them identical so they get fully hashed
+    size = max(1, int(128 * scale)) * MB
+    for i in range(3):
+        w.write(os.path.join(root, f"big{i}.img"), size, seed=0 if i < 2 else 1)
+
+
+def _tiny(root, w, scale):
+    # Lots of files of a few bytes (the walk and stat costs dominate)
+    index = 0
+    for d in range(max(1, int(100 * scale))):
+        parent = os.path.join(root, f"d{d:03d}")
+        os.makedirs(parent)
+        for _ in range(400):
+            w.write(os.path.join(parent, w.name(index, '.txt')), w.rng.randint(0, 64))
+            index += 1
+
+
+SHAPES = {
+    'wide': _wide,
+    'deep': _deep,
+    'dupes': _dupes,
+    'huge': _huge,
+    'tiny': _tiny,
+}
+
+
+def make_tree(root, shape, scale=1.0, seed=0):
+    # Builds `shape` under root (which must not exist yet, or hold a tree
+    # made with the same arguments, which is then reused). Returns the
+    # manifest: {"shape", "scale", "seed", "files", "bytes", "generated"}.
+    params = {"shape": shape, "scale": scale, "seed": seed}
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if {key: manifest.get(key) for key in params} == params:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    if os.path.exists(root) and os.listdir(root):
+        raise FileExistsError(f"{root} is not empty and wasn't made by treegen")
+
+    os.makedirs(root, exist_ok=True)
+    # string seeds are hashed with sha512 by random, so this is stable
+    # across runs (unlike hash())
+    writer = _Writer(random.Random(f"{shape}:{seed}"), time.time())
+    SHAPES[shape](root, writer, scale)
+
+    manifest = dict(params, files=writer.files, bytes=writer.bytes, generated=writer.now)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest
@@ -0,0 +1,315 @@
+import os
+import json
+import time
+import shutil
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# How many threads unlink at once - deletes are metadata bound, so a few
+# in flight keep the filesystem busy without thrashing the journal
+DELETE_WORKERS = 8
+
+# Files per work item, so one huge directory is still spread over threads
+DELETE_CHUNK = 512
+
+# How often on_progress gets called, in seconds
+PROGRESS_INTERVAL = 0.1
+
+# Where quarantined files go on filesystems other than the one the
+# quarantine dir is on - rename() can't cross filesystems, so every
+# filesystem gets its own spot at its mount point
+QUARANTINE_DIRNAME = '.ghostydisk-quarantine'
+MANIFEST_SUFFIX = '.manifest'
+
+# total: paths asked for, done: how many were handled,
+# failed: [(path, error message)], elapsed: seconds
+CleanupReport = namedtuple('CleanupReport', ['total', 'done', 'failed', 'elapsed'])
+
+_USE_DIR_FD = os.unlink in os.supports_dir_fd and hasattr(os, 'O_DIRECTORY')
+
+
+class _Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def advance(self):
+        with self.lock:
+            self.value += 1
+
+
+def _run_chunks(func, chunks, total, workers, on_progress, progress_interval):
+    # Runs func(chunk, counter) -> [(path, error)] for every chunk on a
+    # bounded pool. on_progress(done, total) is called at a fixed rate from
+    # the calling thread, however fast or slow the work is going.
+    start = time.time()
+    counter = _Counter()
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {pool.submit(func, chunk, counter) for chunk in chunks}
+        while pending:
+            done, pending = wait(pending, timeout=progress_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                failed.extend(future.result())
+            if on_progress is not None:
+                on_progress(counter.value, total)
+
+    if on_progress is not None:
+        on_progress(total, total)
+    return CleanupReport(total, total - len(failed), failed, time.time() - start)
+
+
+def _chunked(items):
+    for i in range(0, len(items), DELETE_CHUNK):
+        yield items[i:i + DELETE_CHUNK]
+
+
+def group_by_parent(paths):
+    # {parent dir: [basenames]}, keeping the order paths came in
+    groups = {}
+    for path in paths:
+        parent, name = os.path.split(path)
+        groups.setdefault(parent, []).append(name)
+    return groups
+
+
+def _remove_one(parent, name, dir_fd):
+    try:
+        if dir_fd is not None:
+            os.unlink(name, dir_fd=dir_fd)
+        else:
+            os.unlink(os.path.join(parent, name))
+    except (IsADirectoryError, PermissionError) as e:
+        # unlink() on a directory fails with EISDIR on Linux, EPERM elsewhere
+        path = os.path.join(parent, name)
+        if not os.path.isdir(path) or os.path.islink(path):
+            raise e
+        shutil.rmtree(path)
+
+
+def _delete_chunk(chunk, counter):
+    # Unlinks a batch of names relative to an fd of their parent directory,
+    # so the kernel doesn't resolve the full path again for every file
+    parent, names = chunk
+    failed = []
+    dir_fd = None
+    if _USE_DIR_FD:
+        try:
+            dir_fd = os.open(parent, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            dir_fd = None
+    try:
+        for name in names:
+            try:
+                _remove_one(parent, name, dir_fd)
+            except Exception as e:
+                failed.append((os.path.join(parent, name), str(e)))
+            counter.advance()
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+    return failed
+
+
+def delete_paths(paths, workers=DELETE_WORKERS, on_progress=None, progress_interval=PROGRESS_INTERVAL):
+    # Deletes every path (a directory is removed recursively)
+    paths = list(dict.fromkeys(paths))  # the same file can be in several categories
+    chunks = [(parent, names)
+              for parent, all_names in group_by_parent(paths).items()
+              for names in _chunked(all_names)]
+    return _run_chunks(_delete_chunk, chunks, len(paths), workers, on_progress, progress_interval)
+
+
+# --- Quarantine ---
+# Instead of deleting, targets are rename()d into a quarantine directory on
+# their own filesystem - no data is copied, so it costs the same as an
+# unlink. Every quarantine run writes <quarantine dir>/<session>.manifest
+# (one JSON object per line: {"src": ..., "dst": ...}) *before* moving
+# anything, so restore_quarantine() can always put things back, even after
+# a crash halfway through.
+
+def _mount_point(path, dev):
+    # Walks up while we stay on the same device
+    path = os.path.abspath(path)
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path:
+            return path
+        try:
+            if os.lstat(parent).st_dev != dev:
+                return path
+        except OSError:
+            return path
+        path = parent
+
+
+def new_session():
+    return time.strftime('%Y%m%d-%H%M%S') + f'-{os.getpid()}'
+
+
+def _manifest_paths(quarantine_dir):
+    try:
+        names = sorted(os.listdir(quarantine_dir))
+    except OSError:
+        return []
+    return [os.path.join(quarantine_dir, name) for name in names if name.endswith(MANIFEST_SUFFIX)]
+
+
+def _read_manifest(manifest):
+    with open(manifest, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _write_manifest(manifest, entries):
+    tmp_path = f"{manifest}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest)
+
+
+def _rename_chunk(chunk, counter):
+    failed = []
+    for src, dst in chunk:
+        try:
+            os.rename(src, dst)
+        except Exception as e:
+            failed.append((src, str(e)))
+        counter.advance()
+    return failed
+
+
+def quarantine_paths(quarantine_dir, paths, session=None, workers=DELETE_WORKERS, on_progress=None,
+                     progress_interval=PROGRESS_INTERVAL):
+    # Moves every path into quarantine under the session name (a fresh one
+    # if not given), which is what restore_quarantine() takes later
+    quarantine_dir = os.path.abspath(quarantine_dir)
+    os.makedirs(quarantine_dir, exist_ok=True)
+    quarantine_dev = os.stat(quarantine_dir).st_dev
+    session = session or new_session()
+
+    manifest = os.path.join(quarantine_dir, session + MANIFEST_SUFFIX)
+    # a session can be added to over several calls (DetailViewer does that)
+    entries = _read_manifest(manifest) if os.path.exists(manifest) else []
+
+    paths = list(dict.fromkeys(os.path.abspath(p) for p in paths))
+    session_dirs = {}  # st_dev -> session dir on that filesystem
+    moves = []
+    failed = []
+    index = len(entries)
+    for path in paths:
+        try:
+            dev = os.lstat(path).st_dev
+            session_dir = session_dirs.get(dev)
+            if session_dir is None:
+                if dev == quarantine_dev:
+                    root = quarantine_dir
+                else:
+                    root = os.path.join(_mount_point(path, dev), QUARANTINE_DIRNAME)
+                session_dir = os.path.join(root, session)
+                os.makedirs(session_dir, exist_ok=True)
+                session_dirs[dev] = session_dir
+        except OSError as e:
+            failed.append((path, str(e)))
+            continue
+        # flat layout, numbered so equal basenames never collide - and
+        # rename() would silently replace whatever is already there
+        while True:
+            dst = os.path.join(session_dir, f"{index}_{os.path.basename(path)}")
+            index += 1
+            if not os.path.lexists(dst):
+                break
+        moves.append((path, dst))
+
+    _write_manifest(manifest, entries + [{"src": src, "dst": dst} for src, dst in moves])
+
+    report = _run_chunks(_rename_chunk, list(_chunked(moves)), len(paths), workers,
+                         on_progress, progress_interval)
+    failed.extend(report.failed)
+    return CleanupReport(len(paths), len(paths) - len(failed), failed, report.elapsed)
+
+
+def _remove_empty_dirs(dirs):
+    for path in dirs:
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+
+def _restore_chunk(chunk, counter):
+    failed = []
+    for entry in chunk:
+        src, dst = entry["src"], entry["dst"]
+        try:
+            # never clobber something that took the file's place since
+            if os.path.lexists(src):
+                raise FileExistsError(f"{src} already exists")
+            os.makedirs(os.path.dirname(src), exist_ok=True)
+            os.rename(dst, src)
+        except Exception as e:
+            failed.append((src, str(e)))
+        counter.advance()
+    return failed
+
+
+def restore_quarantine(quarantine_dir, session=None, workers=DELETE_WORKERS, on_progress=None,
+                       progress_interval=PROGRESS_INTERVAL):
+    # Puts quarantined files back where they came from - every session, or
+    # just the given one. Entries that failed stay in their manifest.
+    start = time.time()
+    total = 0
+    failed = []
+    for manifest in _manifest_paths(quarantine_dir):
+        if session is not None and os.path.basename(manifest) != session + MANIFEST_SUFFIX:
+            continue
+        entries = _read_manifest(manifest)
+        # files the run never got to move are simply not there
+        pending = [entry for entry in entries if os.path.lexists(entry["dst"])]
+        total += len(pending)
+        report = _run_chunks(_restore_chunk, list(_chunked(pending)), len(pending), workers,
+                             on_progress, progress_interval)
+        failed.extend(report.failed)
+
+        failed_srcs = {path for path, _ in report.failed}
+        remaining = [entry for entry in pending if entry["src"] in failed_srcs]
+        if remaining:
+            _write_manifest(manifest, remaining)
+        else:
+            os.remove(manifest)
+        _remove_empty_dirs({os.path.dirname(entry["dst"]) for entry in entries})
+    return CleanupReport(total, total - len(failed), failed, time.time() - start)
+
+
+def purge_quarantine(quarantine_dir, older_than=0, workers=DELETE_WORKERS, on_progress=None,
+                     progress_interval=PROGRESS_INTERVAL):
+    # Really deletes everything quarantined more than older_than seconds ago,
+    # all sessions in one bulk delete_paths() run
+    cutoff = time.time() - older_than
+    manifests = []
+    targets = []
+    for manifest in _manifest_paths(quarantine_dir):
+        try:
+            if os.stat(manifest).st_mtime > cutoff:
+                continue
+            entries = _read_manifest(manifest)
+        except (OSError, ValueError):
+            continue
+        manifests.append((manifest, entries))
+        targets.extend(entry["dst"] for entry in entries if os.path.lexists(entry["dst"]))
+
+    report = delete_paths(targets, workers, on_progress, progress_interval)
+
+    failed_dsts = {path for path, _ in report.failed}
+    for manifest, entries in manifests:
+        remaining = [entry for entry in entries if entry["dst"] in failed_dsts]
+        if remaining:
+            _write_manifest(manifest, remaining)
+        else:
+            os.remove(manifest)
+        _remove_empty_dirs({os.path.dirname(entry["dst"]) for entry in entries})
+    return report
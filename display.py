@@ -27,6 +27,9 @@ import random
 import math
 import subprocess
 
+from cleanup import new_session, quarantine_paths
+from resultstore import heaviest_dirs
+
 # Todo: I should probably clean this up someday
 # These are all the stupid imports we need
 # Might move to a requirements.txt file later
@@ -199,16 +202,45 @@ def format_path(path: str, max_length: int = 40) -> str:
     return path
 
 
+def _histogram_table(title, first_column, rows, bar_width=20):
+    # rows: (label, files, bytes); the bar follows bytes
+    table = Table(title=title, box=box.SIMPLE, title_justify="left")
+    table.add_column(first_column)
+    table.add_column("", no_wrap=True)
+    table.add_column("Files", justify="right")
+    table.add_column("Size", justify="right")
+    biggest = max((nbytes for _, _, nbytes in rows), default=0) or 1
+    for label, files, nbytes in rows:
+        bar = "█" * round(bar_width * nbytes / biggest)
+        table.add_row(label, f"[cyan]{bar}[/cyan]", str(files), format_size(nbytes))
+    return table
+
+
 def show_scan_summary(results, scan_path):
+    # Hardlinked paths share one inode (and one set of blocks), so each
+    # inode only counts once towards the totals below
+    inode_of = {}
+    for inode, paths in results.get("hardlinks", {}).items():
+        for path in paths:
+            inode_of[path] = inode
+
+    def unique_size(entries):
+        total = 0
+        counted = set()
+        for path, size in entries:
+            inode = inode_of.get(path)
+            if inode is not None:
+                if inode in counted:
+                    continue
+                counted.add(inode)
+            total += size  # could use sum() but this is more explicit
+        return total
+
     # Count up the total size of ghost files
-    ghost_size = 0
-    for _, size, _ in results["ghosts"]:
-        ghost_size += size  # could use sum() but this is more explicit
+    ghost_size = unique_size((path, size) for path, size, _ in results["ghosts"])
     
     # Same for large files
-    large_size = 0
-    for _, size in results["large"]:
-        large_size += size
+    large_size = unique_size(results["large"])
 
     # Build a table to display the summary
     summary = Table.grid(padding=(0, 2))
@@ -224,9 +256,44 @@ def show_scan_summary(results, scan_path):
                     f"{len(results['large'])} ({format_size(large_size)})")
     summary.add_row("⌛ Old Files:", str(len(results['old'])))
     summary.add_row("🌀 Duplicates:", f"{len(results['duplicates'])} groups")
+    if results.get("hardlinks"):
+        # deleting one of these frees nothing, so they're not duplicates
+        summary.add_row("🔗 Hardlinks:", f"{len(results['hardlinks'])} groups (same file, several names)")
+
+    content = summary
+    heaviest = heaviest_dirs(results.get("directories", {}), 10)
+    if heaviest:
+        dirs_table = Table(title="📂 Heaviest Directories", box=box.SIMPLE, title_justify="left")
+        dirs_table.add_column("Directory", overflow="fold")
+        dirs_table.add_column("On disk", justify="right")
+        dirs_table.add_column("Apparent", justify="right")
+        dirs_table.add_column("Files", justify="right")
+        for path, totals in heaviest:
+            dirs_table.add_row(escape(path), format_size(totals.allocated),
+                               format_size(totals.size), str(totals.files))
+        content = Group(content, Text(""), dirs_table)
+
+    if results.get("ghost_rules"):
+        rules_table = Table(title="👻 Ghost Rule Hits", box=box.SIMPLE, title_justify="left")
+        rules_table.add_column("Rule")
+        rules_table.add_column("Files", justify="right")
+        rules_table.add_column("Size", justify="right")
+        for rule, files, nbytes in results["ghost_rules"]:
+            rules_table.add_row(escape(rule), str(files), format_size(nbytes))
+        content = Group(content, Text(""), rules_table)
+
+    stats = results.get("stats")
+    if stats is not None:
+        size_rows = [(f"{format_size(lo)} - {format_size(hi)}" if hi > 1 else "empty", files, nbytes)
+                     for lo, hi, files, nbytes in stats.size_histogram()]
+        ext_rows = [(escape(ext) or "(none)", files, nbytes) for ext, files, nbytes in stats.top_extensions(8)]
+        content = Group(content,
+                        _histogram_table("📏 File Sizes", "Size", size_rows),
+                        _histogram_table("🕰️  File Ages", "Modified", stats.age_histogram()),
+                        _histogram_table("🧩 Extensions", "Extension", ext_rows))
 
     print("\n")
-    print(Panel(summary, title="📊 Scan Summary",
+    print(Panel(content, title="📊 Scan Summary",
           border_style="blue", box=box.ROUNDED))
 
 
@@ -261,9 +328,12 @@ class DetailViewer:
     
     - Doddy (May 2023)
     """
-    def __init__(self, results: Dict[str, Any], category: str):
+    def __init__(self, results: Dict[str, Any], category: str, quarantine_dir: str = None):
         self.results = results
         self.category = category
+        # when set, [d] moves files into quarantine instead of deleting them
+        self.quarantine_dir = quarantine_dir
+        self.quarantine_session = new_session()
         self.current_page = 0
         # Magic number - looks good on my terminal
         self.items_per_page = 10  
@@ -390,7 +460,11 @@ class DetailViewer:
             path = self.items[index][0]
             
         try:
-            if os.path.isfile(path):
+            if self.quarantine_dir:
+                report = quarantine_paths(self.quarantine_dir, [path], self.quarantine_session)
+                if report.failed:
+                    raise OSError(report.failed[0][1])
+            elif os.path.isfile(path):
                 os.remove(path)
             elif os.path.isdir(path):
                 shutil.rmtree(path)
@@ -438,16 +512,20 @@ class DetailViewer:
                     path = self.items[self.selected_index][1]
                 else:
                     path = self.items[self.selected_index][0]
-                if Confirm.ask(f"Delete {path}?"):
+                action = "Quarantine" if self.quarantine_dir else "Delete"
+                if Confirm.ask(f"{action} {path}?"):
                     if self.delete_item(self.selected_index):
-                        console.print("[green]File deleted successfully[/green]")
+                        if self.quarantine_dir:
+                            console.print("[green]File moved to quarantine[/green]")
+                        else:
+                            console.print("[green]File deleted successfully[/green]")
                         time.sleep(1)
                     else:
                         console.print("[red]Failed to delete file[/red]")
                         time.sleep(1)
 
-def show_details(results: Dict[str, Any], category: str):
-    viewer = DetailViewer(results, category)
+def show_details(results: Dict[str, Any], category: str, quarantine_dir: str = None):
+    viewer = DetailViewer(results, category, quarantine_dir)
     viewer.show()
 
 
@@ -0,0 +1,172 @@
+import os
+import re
+import fnmatch
+
+# What counts as a ghost file. Patterns are globs against the basename:
+#   '*.tmp', '*~'  -> plain suffixes, matched case-insensitively
+#   'core.[0-9]*'  -> anything else, matched like fnmatch on Linux
+#   'orphan:*.pyc' -> only files whose source is gone (see ORPHAN_SOURCES)
+# Left out on purpose, for --ghost-rules when wanted: downloads still in
+# progress ('*.crdownload', '*.part', '*.partial') and files deleted while
+# still open on NFS / FUSE ('.nfs[0-9a-f]*', '.fuse_hidden*') - removing
+# those breaks whoever is using them.
+DEFAULT_GHOST_RULES = [
+    # Temporary files
+    '*.tmp',
+    '*.temp',
+    '*.$$$',
+    # Backups left by editors and tools
+    '*.bak',
+    '*.old',
+    '*~',
+    # patch / merge leftovers
+    '*.orig',
+    '*.rej',
+    '*_BACKUP_[0-9]*',
+    '*_BASE_[0-9]*',
+    '*_LOCAL_[0-9]*',
+    '*_REMOTE_[0-9]*',
+    # Editor swap / lock files
+    '*.swp',
+    '*.swo',
+    '*.swn',
+    '*.kate-swp',
+    '.#*',          # emacs lock
+    '#*#',          # emacs autosave
+    '.~lock.*#',    # LibreOffice
+    '~$*',          # MS Office owner file
+    # Crash dumps
+    'core',
+    'core.[0-9]*',
+    '*.dmp',
+    'hs_err_pid*',
+    # Bytecode without its source
+    'orphan:*.pyc',
+    'orphan:*.pyo',
+]
+
+ORPHAN_PREFIX = 'orphan:'
+
+# Compiled extension -> source extension, for orphan: rules
+ORPHAN_SOURCES = {'.pyc': '.py', '.pyo': '.py'}
+
+
+def _source_missing(path, name):
+    # foo.pyc next to foo.py. __pycache__ is in the default excludes, so
+    # Python 3's __pycache__/foo.cpython-312.pyc never gets this far.
+    stem, ext = os.path.splitext(name)
+    source_ext = ORPHAN_SOURCES.get(ext.lower())
+    if source_ext is None:
+        return False
+    return not os.path.exists(os.path.join(os.path.dirname(path), stem + source_ext))
+
+
+def _literal_runs(glob):
+    # The plain-text pieces of a glob, '*_BACKUP_[0-9]*' -> ['_BACKUP_']
+    return [run for run in re.split(r'\*|\?|\[[^\]]*\]', glob) if run]
+
+
+def _combine(globs):
+    # [(rule index, glob)] -> one regex; its named group says which rule hit
+    return re.compile('|'.join(f"(?P<r{index}>{fnmatch.translate(glob)})" for index, glob in globs))
+
+
+class GhostRules:
+    # The rule set compiled once, so classifying a name costs a few dict
+    # lookups and at most a couple of regex matches however many rules
+    # there are:
+    #   - '*.ext' rules          -> {lowercased extension: rule}, one lookup
+    #   - other '*<literal>'     -> {lowercased suffix: rule}, one lookup per
+    #     rules ('*~')              distinct suffix length
+    #   - globs starting with a  -> one combined regex per first character,
+    #     literal ('core.[0-9]*')   only tried on names starting with it
+    #   - the rest ('*_BASE_*')  -> one combined regex, only tried when the
+    #     name contains one of their literal pieces
+    # Suffix rules win over the regex ones; otherwise the first rule wins.
+    def __init__(self, patterns):
+        self.rules = []
+        self.orphan = set()
+        self.extensions = {}
+        self.suffixes = {}
+        anchored = {}
+        floating = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern in self.rules:
+                continue
+            glob = pattern
+            orphan = glob.startswith(ORPHAN_PREFIX)
+            if orphan:
+                glob = glob[len(ORPHAN_PREFIX):].strip()
+                if not glob:
+                    # 'orphan:' alone names no files
+                    continue
+            index = len(self.rules)
+            self.rules.append(pattern)
+            if orphan:
+                self.orphan.add(index)
+            body = glob[1:]
+            if glob.startswith('*') and body and not any(c in body for c in '*?['):
+                if body[0] == '.' and body.count('.') == 1:
+                    self.extensions.setdefault(body.lower(), index)
+                else:
+                    self.suffixes.setdefault(body.lower(), index)
+            elif glob[0] not in '*?[':
+                anchored.setdefault(glob[0], []).append((index, glob))
+            else:
+                floating.append((index, glob))
+
+        self.suffix_lengths = sorted({len(suffix) for suffix in self.suffixes}, reverse=True)
+        self.anchored = {char: _combine(globs) for char, globs in anchored.items()}
+        # a floating glob without any literal piece ('*') matches anything
+        self.literals = None
+        if floating:
+            runs = [_literal_runs(glob) for _, glob in floating]
+            if all(runs):
+                self.literals = tuple({max(run, key=len) for run in runs})
+        self.floating = _combine(floating) if floating else None
+
+    def match(self, name, path=None):
+        # Index of the rule `name` hits, or None. path is only needed for
+        # orphan: rules.
+        # a dotfile that is all extension ('.bak') isn't a backup of
+        # anything - splitext() never called that an extension either
+        dot = name.rfind('.')
+        index = self.extensions.get(name[dot:].lower()) if dot > 0 else None
+        if index is None and self.suffix_lengths:
+            lower = name.lower()
+            for length in self.suffix_lengths:
+                if length < len(lower):
+                    index = self.suffixes.get(lower[-length:])
+                    if index is not None:
+                        break
+        if index is None and name:
+            regex = self.anchored.get(name[0])
+            m = regex.match(name) if regex is not None else None
+            if m is None and self.floating is not None and (
+                    self.literals is None or any(literal in name for literal in self.literals)):
+                m = self.floating.match(name)
+            if m is not None:
+                index = int(m.lastgroup[1:])
+        if index in self.orphan and not _source_missing(path or name, name):
+            return None
+        return index
+
+
+def build_ghost_rules(ghost_rules=None):
+    # Default rules plus the user's, from a list or a txt file with one
+    # pattern per line ('# ' starts a comment); '!pattern' drops a default
+    if isinstance(ghost_rules, GhostRules):
+        return ghost_rules
+    if ghost_rules is None:
+        extra = []
+    elif isinstance(ghost_rules, str):
+        with open(ghost_rules, 'r') as f:
+            extra = [line.strip() for line in f
+                     if line.strip() and not line.startswith('# ') and line.strip() != '#']
+    else:
+        extra = list(ghost_rules)
+
+    dropped = {pattern[1:] for pattern in extra if pattern.startswith('!')}
+    patterns = [p for p in DEFAULT_GHOST_RULES + extra if not p.startswith('!') and p not in dropped]
+    return GhostRules(patterns)
@@ -1,24 +1,33 @@
 from time import sleep
 from typing import Any, Dict
-from scanner import scan_all
+from scanner import scan_all, stream_scan, OLD_TIME_FIELDS
 from display import animate_ghost_logo, logo, MultiSelectList, ScrollableList, display_results, display_options, interactive_display_options, clear, center_print, error_print, show_details, show_scan_summary, show_thank_you_message, success_print, note_print, cyberbunk_display_options, console
 from colorama import Fore
 from rich.prompt import Prompt
 import os
 import sys
 import argparse
+import multiprocessing
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn
-from rich.live import Live
 from rich.panel import Panel
-from rich.layout import Layout
 from rich.console import Group
 import time
-import shutil
 
-from utils import export_results, results_to_list
+import utils
+from utils import export_results, results_to_list, set_buffer_size, resolve_hash_algorithm, NdjsonWriter, EXPORT_FORMATS, HASH_ALGORITHMS
+from cleanup import delete_paths, quarantine_paths, restore_quarantine, purge_quarantine, new_session, DELETE_WORKERS
+
+# Menu entries for picking the duplicate hash algorithm
+HASH_ALGO_OPTIONS = [('1', 'MD5'), ('2', 'SHA1'), ('3', 'BLAKE2b'), ('4', 'Auto (fastest on this machine)')]
+HASH_ALGO_CHOICES = {'1': 'md5', '2': 'sha1', '3': 'blake2b', '4': 'auto'}
+
+# Menu entries for which timestamp makes a file "old"
+OLD_TIME_OPTIONS = [('1', 'Last Modified'), ('2', 'Last Accessed'), ('3', 'Changed (metadata)'), ('4', 'Created (if available)')]
+OLD_TIME_CHOICES = {'1': 'mtime', '2': 'atime', '3': 'ctime', '4': 'birthtime'}
 
 orig_cwd          = str(os.getcwd())
 working_directory = os.getcwd()
+quarantine_dir    = None  # --quarantine: move files here instead of deleting them
 
 def print_cwd():
     console.print(f"[dim]Current directory: {working_directory}[/dim]")
@@ -66,7 +75,7 @@ def scan_all_tab():
         choice = Prompt.ask("Select an option", choices=[
                             "1", "2", "3", "4", "5"])
         if choice == "1":
-            show_details(scan_result, 'all')
+            show_details(scan_result, 'all', quarantine_dir)
         elif choice == "2":
             ScrollableList(
                 results_to_list(scan_result),
@@ -94,16 +103,28 @@ def scan_large_files_tab():
     clear()
     center_print("Scan for Large Files 💾")
     print_cwd()
+    mode = Prompt.ask("[green]Find files over a size, or just the N largest?[/green]",
+                      choices=["size", "top"], default="size")
+    top = None
     while True:
-        size = Prompt.ask("[green]Enter file size threshold in MB (default: 50MB): (or 'q' to go back)[/green]", default=f"{50}")
-        if size == 'q':
+        if mode == "top":
+            answer = Prompt.ask("[green]How many of the largest files? (default: 20): (or 'q' to go back)[/green]", default=f"{20}")
+        else:
+            answer = Prompt.ask("[green]Enter file size threshold in MB (default: 50MB): (or 'q' to go back)[/green]", default=f"{50}")
+        if answer == 'q':
             main()
             return
         try:
-            size = int(size)
+            answer = int(answer)
             break
         except:
-            error_print("File size should be a number!")
+            error_print("That should be a number!")
+
+    if mode == "top":
+        # no threshold to guess - a bounded heap keeps the N biggest
+        size, top = 0, answer
+    else:
+        size = answer
     
     scan_result = scan_all(
         working_directory, 
@@ -112,7 +133,8 @@ def scan_large_files_tab():
         scan_large=True,
         scan_old=False,
         scan_duplicates=False,
-        large_threshold=size * 1024 * 1024
+        large_threshold=size * 1024 * 1024,
+        large_top=top
     )
     
     clear()
@@ -127,7 +149,7 @@ def scan_large_files_tab():
         choice = Prompt.ask("Select an option", choices=[
                             "1", "2", "3", "4", "5"])
         if choice == "1":
-            show_details(scan_result, 'large')
+            show_details(scan_result, 'large', quarantine_dir)
         elif choice == "2":
             ScrollableList(
                 results_to_list(scan_result),
@@ -165,7 +187,7 @@ def scan_old_files_tab():
         except:
             error_print("File age should be a number!")
     
-    date_type = interactive_display_options(title="Use which date type?", options=[('1', 'Last Modified'), ('2', 'Last Accessed'), ('3', 'Created (if available)')])
+    date_type = interactive_display_options(title="Use which date type?", options=OLD_TIME_OPTIONS)
     
     scan_result = scan_all(
         working_directory, 
@@ -174,7 +196,8 @@ def scan_old_files_tab():
         scan_large=False,
         scan_old=True,
         scan_duplicates=False,
-        old_threshold=age * 24 * 3600
+        old_threshold=age * 24 * 3600,
+        old_time=OLD_TIME_CHOICES.get(date_type, 'mtime')
     )
     
     clear()
@@ -189,7 +212,7 @@ def scan_old_files_tab():
         choice = Prompt.ask("Select an option", choices=[
                             "1", "2", "3", "4", "5"])
         if choice == "1":
-            show_details(scan_result, 'old')
+            show_details(scan_result, 'old', quarantine_dir)
         elif choice == "2":
             ScrollableList(
                 results_to_list(scan_result),
@@ -238,7 +261,7 @@ def scan_ghost_files_tab():
         choice = Prompt.ask("Select an option", choices=[
                             "1", "2", "3", "4", "5"])
         if choice == "1":
-            show_details(scan_result, 'ghosts')
+            show_details(scan_result, 'ghosts', quarantine_dir)
         elif choice == "2":
             ScrollableList(
                 results_to_list(scan_result),
@@ -266,8 +289,8 @@ def scan_duplicates_tab():
     center_print("Scan for Duplicates 🌀")
     print_cwd()
     
-    hash_algo = interactive_display_options(title="Hash algorithm to use:", options=[('1', 'MD5 (faster)'), ('2', 'SHA1 (more secure)')])
-    hash_algorithm = 'sha1' if hash_algo == '2' else 'md5'
+    hash_algo = interactive_display_options(title="Hash algorithm to use:", options=HASH_ALGO_OPTIONS)
+    hash_algorithm = HASH_ALGO_CHOICES.get(hash_algo, 'md5')
     
     scan_result = scan_all(
         working_directory, 
@@ -291,7 +314,7 @@ def scan_duplicates_tab():
         choice = Prompt.ask("Select an option", choices=[
                             "1", "2", "3", "4", "5"])
         if choice == "1":
-            show_details(scan_result, 'duplicates')
+            show_details(scan_result, 'duplicates', quarantine_dir)
         elif choice == "2":
             ScrollableList(
                 results_to_list(scan_result),
@@ -319,21 +342,25 @@ def show_export_options_tab(results: Dict[str, Any]):
         ("1", "Plain Text (.txt)"),
         ("2", "JSON (.json)"),
         ("3", "Markdown (.md)"),
-        ("4", "Back")
+        ("4", "NDJSON, one finding per line (.ndjson)"),
+        ("5", "SQLite database (.sqlite)"),
+        ("6", "Back")
     ]
     
     while True:
         console.clear()
         cyberbunk_display_options(options, title="Export as:")
-        choice = Prompt.ask("Select an option", choices=["1", "2", "3", "4"])
+        choice = Prompt.ask("Select an option", choices=["1", "2", "3", "4", "5", "6"])
         
-        if choice == "4":
+        if choice == "6":
             break
             
         format_map = {
             "1": "txt",
             "2": "json",
-            "3": "md"
+            "3": "md",
+            "4": "ndjson",
+            "5": "sqlite"
         }
         
         try:
@@ -348,109 +375,147 @@ def show_export_options_tab(results: Dict[str, Any]):
             error_print(f"\nError exporting results: {str(e)}")
             sleep(2)
 
-def show_progress(message: str, total: int, process_func):
-    layout = Layout()
-    layout.split_column(
-        Layout(name="header", size=3),
-        Layout(name="progress", size=3),
-        Layout(name="status", size=3)
-    )
-    
-    with Live(layout, refresh_per_second=10) as live:
-        # Update header
-        layout["header"].update(Panel(message, style="bold blue"))
-        
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TaskProgressColumn(),
-            TimeRemainingColumn(),
-            console=console
-        ) as progress:
-            task = progress.add_task("[cyan]Processing...", total=total)
-            
-            success_count = 0
-            failed_items = []
-            
-            while not progress.finished:
-                success, item_name = process_func()
-                if success:
-                    success_count += 1
-                    layout["status"].update(
-                        Panel(f"[green]✓ Successfully processed: {item_name}", style="green")
-                    )
-                else:
-                    failed_items.append(item_name)
-                    layout["status"].update(
-                        Panel(f"[red]✗ Failed to process: {item_name}", style="red")
-                    )
-                progress.update(task, advance=1)
-                time.sleep(0.1)  # Small delay for visual feedback
-    
+def show_cleanup_progress(message: str, total: int, run):
+    # run(on_progress) does the actual work and returns a CleanupReport;
+    # the cleanup functions call back at a fixed rate, not once per file
+    console.print(Panel(message, style="bold blue"))
+
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        TimeRemainingColumn(),
+        console=console
+    ) as progress:
+        task = progress.add_task("[cyan]Processing...", total=total)
+        report = run(lambda done, total: progress.update(task, completed=done, total=total))
+
     # Show final summary
-    if failed_items:
+    if report.failed:
         console.print("\n[red]Failed items:[/red]")
-        for item in failed_items:
-            console.print(f"[red]  - {item}[/red]")
-    
-    console.print(f"\n[green]Successfully processed: {success_count}/{total} items[/green]")
-    return success_count, failed_items
+        for path, error in report.failed:
+            console.print(f"[red]  - {path} ({error})[/red]")
 
-def handle_confirm_deletion(scan_result, res):
+    console.print(f"\n[green]Successfully processed: {report.done}/{report.total} items "
+                  f"in {report.elapsed:.1f}s[/green]")
+    return report
+
+def handle_confirm_deletion(scan_result, res, workers=DELETE_WORKERS):
     if res.lower() != 'yes':
         return
     
-    items_to_delete = results_to_list(scan_result, kind=True)
+    items_to_delete = results_to_list(scan_result)
     
     if not items_to_delete:
         note_print("No files to delete!")
         return
     
-    def delete_process():
-        if not items_to_delete:
-            return False, ""
-        
-        item_type, path = items_to_delete.pop(0)
-        try:
-            if os.path.isfile(path):
-                os.remove(path)
-            elif os.path.isdir(path):
-                shutil.rmtree(path)
-            return True, f"{item_type}: {path}"
-        except Exception as e:
-            return False, f"{item_type}: {path} ({str(e)})"
-    
-    success_count, failed_items = show_progress(
-        "🗑️  Deleting files...",
-        len(items_to_delete),
-        delete_process
-    )
-    
-    if success_count > 0:
-        success_print(f"\nSuccessfully deleted {success_count} items!")
-    if failed_items:
-        error_print(f"\nFailed to delete {len(failed_items)} items.")
+    if quarantine_dir:
+        session = new_session()
+        report = show_cleanup_progress(
+            "📦  Moving files to quarantine...",
+            len(items_to_delete),
+            lambda on_progress: quarantine_paths(quarantine_dir, items_to_delete, session, workers, on_progress)
+        )
+        if report.done > 0:
+            success_print(f"\nMoved {report.done} items to quarantine!")
+            note_print(f"Undo with: --quarantine {quarantine_dir} --restore {session}")
+    else:
+        report = show_cleanup_progress(
+            "🗑️  Deleting files...",
+            len(items_to_delete),
+            lambda on_progress: delete_paths(items_to_delete, workers, on_progress)
+        )
+        if report.done > 0:
+            success_print(f"\nSuccessfully deleted {report.done} items!")
+    if report.failed:
+        error_print(f"\nFailed to {'quarantine' if quarantine_dir else 'delete'} {len(report.failed)} items.")
     
     time.sleep(2)
     sys.exit()
 
+def handle_quarantine_actions(args, workers=DELETE_WORKERS):
+    # --restore / --purge-quarantine work on what earlier runs quarantined
+    if args.restore:
+        session = None if args.restore == 'all' else args.restore
+        report = show_cleanup_progress(
+            "♻️  Restoring quarantined files...",
+            0,
+            lambda on_progress: restore_quarantine(quarantine_dir, session, workers, on_progress)
+        )
+        success_print(f"\nRestored {report.done} items!")
+        if report.failed:
+            error_print(f"\nFailed to restore {len(report.failed)} items (kept in the manifest).")
+    if args.purge_quarantine is not None:
+        report = show_cleanup_progress(
+            "🗑️  Purging quarantine...",
+            0,
+            lambda on_progress: purge_quarantine(quarantine_dir, args.purge_quarantine * 24 * 3600,
+                                                 workers, on_progress)
+        )
+        success_print(f"\nPermanently deleted {report.done} quarantined items!")
+        if report.failed:
+            error_print(f"\nFailed to delete {len(report.failed)} items (kept in the manifest).")
+
+def _positive_int(value):
+    # argparse type for counts where 0 makes no sense
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def _buffer_size_spec(spec):
+    # argparse type for --buffer-size: '[PATH=]MB' -> (path or None, bytes)
+    path, _, size = spec.rpartition('=')
+    try:
+        nbytes = int(float(size) * 1024 * 1024)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a size in MB: {size}")
+    if nbytes < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1 byte, got {size} MB")
+    return path or None, nbytes
+
 def parse_arguments():
     parser = argparse.ArgumentParser(description="GhostyDisk - Terminal Ghost File Hunter")
     parser.add_argument('--path', type=str, help='Custom scan path')
     parser.add_argument('--large', type=int, help='Set large file threshold in MB')
+    parser.add_argument('--top', type=_positive_int, metavar='N', help='Report the N largest files (over --large MB, if given)')
     parser.add_argument('--old', type=int, help='Set "old file" age in days')
+    parser.add_argument('--old-time', type=str, choices=OLD_TIME_FIELDS, default='mtime',
+                        help='Timestamp --old goes by (birthtime falls back to mtime where there is none)')
     parser.add_argument('--ghost', action='store_true', help='Include ghost file scan')
+    parser.add_argument('--ghost-rules', type=str, metavar='FILE',
+                        help='Read extra ghost patterns from a txt file (!PATTERN drops a built-in one)')
     parser.add_argument('--no-dupes', action='store_true', help='Exclude duplicate scan')
     parser.add_argument('--dry-run', action='store_true', help='Simulate all actions, no deletion')
     parser.add_argument('--delete', action='store_true', help='Auto-delete without prompting')
     parser.add_argument('--export', type=str, help='Export report to file')
-    parser.add_argument('--hash-algo', type=str, choices=['md5', 'sha1'], help='Choose hash algo for duplicates')
+    parser.add_argument('--export-format', type=str, choices=EXPORT_FORMATS, default='txt',
+                        help='Report format for --export (ndjson is written while scanning, sqlite is indexed for queries)')
+    parser.add_argument('--hash-algo', type=str, choices=list(HASH_ALGORITHMS) + ['auto'],
+                        help="Choose hash algo for duplicates ('auto' benchmarks and picks the fastest 128-bit or wider one)")
     parser.add_argument('--exclude', type=str, help='Read exclude patterns from txt/json')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N', help='Hash files with N threads')
+    parser.add_argument('--quarantine', type=str, metavar='DIR',
+                        help='Move files into DIR instead of deleting them (restorable)')
+    parser.add_argument('--restore', nargs='?', const='all', metavar='SESSION',
+                        help='Put quarantined files back (every session, or just SESSION)')
+    parser.add_argument('--purge-quarantine', type=int, metavar='DAYS',
+                        help='Permanently delete files quarantined more than DAYS days ago')
+    parser.add_argument('--delete-jobs', type=int, default=DELETE_WORKERS, metavar='N',
+                        help=f'Delete files with N threads (default {DELETE_WORKERS})')
+    parser.add_argument('--processes', type=int, default=1, metavar='N', help='Walk the tree with N processes')
+    parser.add_argument('--no-cache', action='store_true', help="Don't use the persistent hash cache")
+    parser.add_argument('--rebuild-cache', action='store_true', help='Drop the hash cache and hash everything again')
+    parser.add_argument('--incremental', action='store_true', help="Reuse the last scan's listing of unchanged directories")
+    parser.add_argument('--buffer-size', type=_buffer_size_spec, action='append', default=[], metavar='[PATH=]MB',
+                        help='Hash read buffer in MB, optionally only for the device PATH is on (repeatable)')
+    parser.add_argument('--mmap', type=_positive_int, metavar='MB', help='Hash files of at least MB megabytes through mmap')
     return parser.parse_args()
 
 def should_show_ui(args):
-    action_args = ['ghost', 'delete', 'dry_run', 'export']
+    action_args = ['ghost', 'delete', 'dry_run', 'export', 'top']
     has_actions = any(getattr(args, arg, False) for arg in action_args)
     
     return not has_actions
@@ -465,6 +530,25 @@ def main():
             error_print("Invalid path specified!")
             return
 
+    for path, size in args.buffer_size:
+        try:
+            set_buffer_size(size, path)
+        except (ValueError, OSError) as e:
+            error_print(f"Invalid --buffer-size {path}: {e}")
+            return
+    if args.mmap is not None:
+        utils.MMAP_MIN_SIZE = args.mmap * 1024 * 1024
+
+    if args.quarantine:
+        global quarantine_dir
+        quarantine_dir = os.path.abspath(args.quarantine)
+    if args.restore or args.purge_quarantine is not None:
+        if not quarantine_dir:
+            error_print("--restore and --purge-quarantine need --quarantine DIR")
+            return
+        handle_quarantine_actions(args, args.delete_jobs)
+        return
+
     # If only config args are passed or no args at all, show UI
     if should_show_ui(args):
         clear()
@@ -529,29 +613,57 @@ def main():
         return
 
     # Handle action arguments
-    if args.ghost or args.large or args.old or not args.no_dupes:
-        scan_result = scan_all(
-            working_directory,
-            live_ui=True,
-            large_threshold=args.large * 1024 * 1024 if args.large else None,
-            old_threshold=args.old * 24 * 3600 if args.old else None,
+    if args.ghost or args.large is not None or args.top is not None or args.old is not None or not args.no_dupes:
+        hash_algo = args.hash_algo or 'md5'
+        stream = None
+        if args.export and args.export_format == 'ndjson':
+            # written line by line during the scan instead of afterwards
+            if not args.no_dupes:
+                hash_algo = resolve_hash_algorithm(hash_algo)
+            stream = NdjsonWriter(f"{args.export}.ndjson", root=working_directory,
+                                  hash_algo=None if args.no_dupes else hash_algo,
+                                  old_time=args.old_time if args.old is not None else None)
+        scan_args = dict(
+            large_threshold=args.large * 1024 * 1024 if args.large is not None else (0 if args.top is not None else None),
+            old_threshold=args.old * 24 * 3600 if args.old is not None else None,
             scan_ghosts=args.ghost,
-            scan_large=args.large is not None,
+            ghost_rules=args.ghost_rules,
+            scan_large=args.large is not None or args.top is not None,
+            large_top=args.top,
             scan_old=args.old is not None,
+            old_time=args.old_time,
             scan_duplicates=not args.no_dupes,
-            hash_algo=args.hash_algo or 'md5',
-            exclude_patterns=args.exclude
+            hash_algo=hash_algo,
+            exclude_patterns=args.exclude,
+            workers=args.jobs,
+            processes=args.processes,
+            use_cache=not args.no_cache,
+            rebuild_cache=args.rebuild_cache,
+            incremental=args.incremental,
         )
+        try:
+            if stream is not None and not args.dry_run and not args.delete:
+                # nothing but the report needs the findings, so none is kept
+                stream_scan(working_directory, stream.write_finding, progress=True, **scan_args)
+                success_print(f"\nResults exported successfully to: {stream.output_file}")
+                return
+            scan_result = scan_all(working_directory, live_ui=True,
+                                   on_finding=stream.write_finding if stream else None, **scan_args)
+        finally:
+            # even a scan that dies leaves a flushed, if partial, report
+            if stream is not None:
+                stream.close()
         
         if args.dry_run:
             note_print("Dry run: No files will be deleted.")
             show_scan_summary(scan_result, working_directory)
         
-        if args.delete:
-            handle_confirm_deletion(scan_result, "yes")
+        # export first, so the report still lists what --delete removes
+        if stream is None and args.export:
+            export_results(scan_result, format_type=args.export_format, output_path=args.export)
         
-        if args.export:
-            export_results(scan_result, format_type='txt', output_path=args.export)
+        if args.delete and not args.dry_run:
+            handle_confirm_deletion(scan_result, "yes", workers=args.delete_jobs)
 
 def scan_multiple_modes(modes):
     clear()
@@ -586,8 +698,8 @@ def scan_multiple_modes(modes):
     
     if scan_duplicates:
         hash_algo = interactive_display_options(title="Hash algorithm to use:", 
-                                              options=[('1', 'MD5 (faster)'), ('2', 'SHA1 (more secure)')])
-        hash_algorithm = 'sha1' if hash_algo == '2' else 'md5'
+                                              options=HASH_ALGO_OPTIONS)
+        hash_algorithm = HASH_ALGO_CHOICES.get(hash_algo, 'md5')
     
     scan_result = scan_all(
         working_directory, 
@@ -636,9 +748,9 @@ def scan_multiple_modes(modes):
                 
                 type_choice = interactive_display_options(title="View details for:", options=options)
                 if type_choice.isdigit() and 1 <= int(type_choice) <= len(scan_types):
-                    show_details(scan_result, scan_types[int(type_choice) - 1])
+                    show_details(scan_result, scan_types[int(type_choice) - 1], quarantine_dir)
             else:
-                show_details(scan_result, scan_types[0] if scan_types else 'all')
+                show_details(scan_result, scan_types[0] if scan_types else 'all', quarantine_dir)
         elif choice == "2":
             ScrollableList(
                 results_to_list(scan_result),
@@ -662,4 +774,8 @@ def scan_multiple_modes(modes):
             break
 
 if __name__ == "__main__":
+    # frozen (PyInstaller) builds on Windows / macOS start --processes
+    # workers by re-running this binary; this hands them to the pool
+    # instead of letting them run main() again
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,99 @@
+import os
+import time
+import sqlite3
+import threading
+
+# Follow XDG if it's set, otherwise the usual ~/.cache
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'ghostydisk')
+CACHE_FILE = os.path.join(CACHE_DIR, 'hashes.sqlite')
+
+# Entries nobody has looked at for this long get dropped on close
+CACHE_MAX_AGE = 30 * 24 * 3600
+
+
+class HashCache:
+    # Remembers file hashes between runs. An entry is only trusted while the
+    # file still has the same (st_dev, st_ino, st_size, st_mtime_ns), so any
+    # write to the file invalidates it. One row per inode, algorithm and
+    # kind ('full' or 'partial<N>'): a changed file simply overwrites its row.
+    def __init__(self, path=CACHE_FILE, max_age=CACHE_MAX_AGE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_age = max_age
+        # hashing runs on a thread pool, so the connection is shared behind a lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                algo TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                seen REAL NOT NULL,
+                PRIMARY KEY (dev, ino, algo, kind)
+            ) WITHOUT ROWID
+        """)
+        self.now = time.time()
+        self.touched = []
+
+    def get(self, key, algorithm, kind='full'):
+        dev, ino, size, mtime_ns = key
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT digest FROM hashes WHERE dev=? AND ino=? AND algo=? AND kind=? AND size=? AND mtime_ns=?",
+                (dev, ino, algorithm, kind, size, mtime_ns)
+            ).fetchone()
+            if row is None:
+                return None
+            # 'seen' is bumped in one go on close instead of a write per hit
+            self.touched.append((self.now, dev, ino, algorithm, kind))
+        return row[0]
+
+    def put(self, key, algorithm, digest, kind='full'):
+        dev, ino, size, mtime_ns = key
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (dev, ino, algorithm, kind, size, mtime_ns, digest, self.now)
+            )
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM hashes")
+            self.conn.commit()
+
+    def evict(self):
+        # Drops entries that haven't been hit for max_age seconds
+        with self.lock:
+            cur = self.conn.execute("DELETE FROM hashes WHERE seen < ?", (self.now - self.max_age,))
+            return cur.rowcount
+
+    def close(self):
+        with self.lock:
+            if self.touched:
+                self.conn.executemany(
+                    "UPDATE hashes SET seen=? WHERE dev=? AND ino=? AND algo=? AND kind=?",
+                    self.touched
+                )
+                self.touched = []
+        self.evict()
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+def open_hash_cache(rebuild=False, path=CACHE_FILE):
+    # The cache is only an optimisation - if it can't be opened (read-only
+    # home, broken file, ...) the scan just runs without it
+    try:
+        cache = HashCache(path)
+        if rebuild:
+            cache.clear()
+        return cache
+    except (OSError, sqlite3.Error):
+        return None
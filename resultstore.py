@@ -0,0 +1,171 @@
+import os
+import heapq
+from array import array
+from collections import namedtuple
+
+# Bits in ResultStore.flags - what a file was reported as
+FLAG_GHOST = 1
+FLAG_LARGE = 2
+FLAG_OLD = 4
+
+KIND_FLAGS = {"ghost": FLAG_GHOST, "large": FLAG_LARGE, "old": FLAG_OLD}
+
+# du-style totals of everything under a directory: apparent bytes (sum of
+# st_size), allocated bytes (st_blocks * 512) and number of files
+DirTotals = namedtuple('DirTotals', ['size', 'allocated', 'files'])
+
+
+def heaviest_dirs(directories, n=10):
+    # [(path, DirTotals)] of the n directories using the most disk space
+    return heapq.nlargest(n, directories.items(), key=lambda item: item[1].allocated)
+
+
+class ResultView:
+    # List-like view over one category of a ResultStore. Iterating / indexing
+    # gives the same tuples the old plain lists held, built on the fly:
+    #   ghost -> (path, size, age), large -> (path, size), old -> (path, age)
+    # so exporters, the summary and DetailViewer don't need to know.
+    __slots__ = ('store', 'kind', 'rows')
+
+    def __init__(self, store, kind):
+        self.store = store
+        self.kind = kind
+        self.rows = array('L')
+
+    def _entry(self, row):
+        store = self.store
+        path = store.path(row)
+        if self.kind == "ghost":
+            return (path, store.sizes[row], store.ages[row])
+        if self.kind == "large":
+            return (path, store.sizes[row])
+        return (path, store.old_ages[row])
+
+    def __iter__(self):
+        for row in self.rows:
+            yield self._entry(row)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entry(row) for row in self.rows[index]]
+        return self._entry(self.rows[index])
+
+    def __repr__(self):
+        return f"ResultView({self.kind!r}, {len(self.rows)} entries)"
+
+
+class ResultStore:
+    # Column store for ghost / large / old findings: one row per reported
+    # file with its size, mtime, the ages the detectors reported and a
+    # flags bitfield, instead of one tuple
+    # (plus boxed int/float) per finding. A file found by several detectors
+    # shares a single row.
+    # Paths are kept as (dir_id, basename) against an interned directory
+    # table - deep trees repeat the same long prefixes over and over - and
+    # only glued back together when someone asks for them.
+    # Findings of late_kinds don't arrive next to the file's other findings
+    # (top-N large files come after the walk); their rows are looked up in
+    # a (dir_id, basename) index built the first time one shows up.
+    def __init__(self, late_kinds=()):
+        self.dirs = []          # dir_id -> directory prefix, separator included
+        self.dir_ids = {}       # directory prefix -> dir_id
+        self.row_dirs = array('L')
+        self.names = []
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.ages = array('d')      # ghost age, from mtime
+        self.old_ages = array('d')  # old age, from the scan's old_time
+        self.flags = array('B')
+        self.views = {kind: ResultView(self, kind) for kind in KIND_FLAGS}
+        self._last_path = None
+        self.late_kinds = late_kinds
+        self._row_index = None
+
+    def path(self, row):
+        return self.dirs[self.row_dirs[row]] + self.names[row]
+
+    def _intern_dir(self, prefix):
+        dir_id = self.dir_ids.get(prefix)
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(prefix)
+            self.dir_ids[prefix] = dir_id
+        return dir_id
+
+    def _late_row(self, path):
+        if self._row_index is None:
+            self._row_index = {(dir_id, name): row
+                               for row, (dir_id, name) in enumerate(zip(self.row_dirs, self.names))}
+        cut = path.rfind(os.sep) + 1
+        dir_id = self.dir_ids.get(path[:cut])
+        if dir_id is None:
+            return None
+        return self._row_index.get((dir_id, path[cut:]))
+
+    def _row_for(self, path, late=False):
+        # all findings for one file arrive back to back, so only the last
+        # row can be the same file - unless it's a late one
+        if path == self._last_path:
+            return len(self.names) - 1
+        if late:
+            row = self._late_row(path)
+            if row is not None:
+                return row
+        self._last_path = path
+
+        cut = path.rfind(os.sep) + 1
+        dir_id = self._intern_dir(path[:cut])
+        if self._row_index is not None:
+            self._row_index[(dir_id, path[cut:])] = len(self.names)
+        self.row_dirs.append(dir_id)
+        self.names.append(path[cut:])
+        self.sizes.append(-1)
+        self.mtimes.append(-1.0)
+        self.ages.append(-1.0)
+        self.old_ages.append(-1.0)
+        self.flags.append(0)
+        return len(self.names) - 1
+
+    def add(self, kind, data, stat=None):
+        # stat: (size, mtime) of the file, when the scanner has it
+        row = self._row_for(data[0], kind in self.late_kinds)
+        if stat is not None:
+            self.sizes[row] = stat[0]
+            self.mtimes[row] = stat[1]
+        if kind == "ghost":
+            self.sizes[row] = data[1]
+            self.ages[row] = data[2]
+        elif kind == "large":
+            self.sizes[row] = data[1]
+        else:
+            self.old_ages[row] = data[1]
+        self.flags[row] |= KIND_FLAGS[kind]
+        self.views[kind].rows.append(row)
+
+    def unique_paths(self, views):
+        # Paths of every row in any of the views, each once, in scan order.
+        # Dedup happens on row numbers, so no path string is built twice.
+        rows = set()
+        for view in views:
+            rows.update(view.rows)
+        return [self.path(row) for row in sorted(rows)]
+
+    def iter_rows(self):
+        # (dir_id, basename, size, mtime, old_age, flags) for every row in
+        # scan order - self.dirs[dir_id] + basename is the path. old_age is
+        # None unless the old scan flagged the file; size / mtime only when
+        # findings came without a stat.
+        row_dirs, names, sizes, mtimes, old_ages, flags = (self.row_dirs, self.names, self.sizes, self.mtimes,
+                                                          self.old_ages, self.flags)
+        for row in range(len(names)):
+            size = sizes[row]
+            mtime = mtimes[row]
+            old_age = old_ages[row]
+            yield (row_dirs[row], names[row], size if size >= 0 else None, mtime if mtime >= 0 else None,
+                   old_age if old_age >= 0 else None, flags[row])
+
+    def __len__(self):
+        return len(self.names)
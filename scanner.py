@@ -1,6 +1,22 @@
 import os
+import re
+import time
+import heapq
+import fnmatch
+import threading
+from collections import namedtuple
+from functools import partial
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 from os.path import isfile, isdir
-from utils import get_file_size, get_file_age, hash_file
+from stat import S_ISREG
+from hashcache import open_hash_cache
+from snapshot import load_snapshot, save_snapshot
+from resultstore import ResultStore, DirTotals
+from stats import ScanStats
+from ghostrules import build_ghost_rules
+from statx import statx, HAVE_STATX
+from utils import get_file_size, get_file_age, get_hasher, hash_file, hash_file_partial, map_bounded, resolve_hash_algorithm, PARTIAL_HASH_SIZE
 from tqdm import tqdm
 from rich.console import Group
 from rich.live import Live
@@ -10,8 +26,6 @@ from rich.table import Table
 from rich.layout import Layout
 from rich.tree import Tree
 
-GHOSTY_EXTENSIONS = [".tmp", ".bak", ".swp"]
-
 DEFAULT_EXCLUDE_PATTERNS = [
     # Version control
     '.git',
@@ -45,6 +59,8 @@ DEFAULT_EXCLUDE_PATTERNS = [
     # Temporary files
     'tmp',
     'temp',
+    # Files we quarantined ourselves (cleanup.QUARANTINE_DIRNAME)
+    '.ghostydisk-quarantine',
     # Dependencies
     'vendor',
     'bower_components',
@@ -52,44 +68,323 @@ DEFAULT_EXCLUDE_PATTERNS = [
     # Database files
     '*.sqlite',
     '*.db',
-    # Backup files
-    '*.bak',
+    # Backup files ('*.bak' / '*.old' are ghosts instead, see ghostrules.py)
     '*.backup',
-    '*.old',
     # System files
     '.DS_Store',
     'Thumbs.db'
 ]
 
-def bld_tree(path, max_depth=2, depth=0, scanned_files=None):
-    tree = Tree(f"📁 {os.path.basename(path) or path}")
-    if depth >= max_depth:
-        return tree
+class ExcludeMatcher:
+    # Exclusions are matched per path component, never as substrings, so
+    # 'out' excludes ./out but not /srv/outbound.
+    #   - literal names ('node_modules', '.git') -> one set lookup
+    #   - name globs ('*.log')                   -> one combined regex
+    #   - globs with a '/' ('docs/*.pdf')        -> matched against the path
+    #     relative to the scan root
+    #   - absolute paths ('/home/me/big')        -> that path and everything
+    #     under it, wherever the scan starts (globs allowed, '/home/*/.cache')
+    def __init__(self, patterns):
+        self.names = set()
+        self.abs_paths = set()
+        name_globs = []
+        path_globs = []
+        abs_globs = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if pattern.startswith('/') or os.path.isabs(pattern):
+                pattern = os.path.normpath(pattern)
+                if any(c in pattern for c in '*?['):
+                    abs_globs.append(fnmatch.translate(pattern))
+                else:
+                    self.abs_paths.add(pattern)
+                continue
+            pattern = pattern.strip('/')
+            if not pattern or pattern.startswith('#'):
+                continue
+            if '/' in pattern:
+                path_globs.append(fnmatch.translate(pattern))
+            elif any(c in pattern for c in '*?['):
+                name_globs.append(fnmatch.translate(pattern))
+            else:
+                self.names.add(pattern)
+
+        self.name_glob = re.compile('|'.join(name_globs)) if name_globs else None
+        self.path_glob = re.compile('|'.join(path_globs)) if path_globs else None
+        self.abs_glob = re.compile('|'.join(abs_globs)) if abs_globs else None
+        # the walker only passes full paths when there's something to check
+        self.wants_path = bool(self.abs_paths) or self.abs_glob is not None
+
+    def match(self, name, rel_path=None, path=None):
+        if name in self.names:
+            return True
+        if self.name_glob is not None and self.name_glob.match(name):
+            return True
+        if self.path_glob is not None and rel_path is not None and self.path_glob.match(rel_path):
+            return True
+        if path is not None and self.wants_path:
+            return self.match_path(path)
+        return False
+
+    def match_path(self, path):
+        # Excluded dirs are never descended into, so the path itself being
+        # listed is enough - except for a scan started inside one
+        if self.abs_glob is not None and self.abs_glob.match(path):
+            return True
+        for prefix in self.abs_paths:
+            if path == prefix or path.startswith(prefix.rstrip(os.sep) + os.sep):
+                return True
+        return False
+
+    def signature(self):
+        # Stable description of the rules, used to key walk snapshots
+        return repr((sorted(self.names),
+                     self.name_glob.pattern if self.name_glob else None,
+                     self.path_glob.pattern if self.path_glob else None,
+                     sorted(self.abs_paths),
+                     self.abs_glob.pattern if self.abs_glob else None))
 
+def build_exclude_matcher(exclude_patterns=None):
+    # Combine default exclusions with user's ones
+    if isinstance(exclude_patterns, ExcludeMatcher):
+        return exclude_patterns
+    if exclude_patterns is None:
+        exclude_patterns = DEFAULT_EXCLUDE_PATTERNS
+    elif isinstance(exclude_patterns, str):
+        try:
+            with open(exclude_patterns, 'r') as f:
+                user_patterns = [line.strip() for line in f if line.strip()]
+            exclude_patterns = DEFAULT_EXCLUDE_PATTERNS + user_patterns
+        except Exception:
+            exclude_patterns = DEFAULT_EXCLUDE_PATTERNS + [exclude_patterns]
+    else:
+        exclude_patterns = DEFAULT_EXCLUDE_PATTERNS + list(exclude_patterns)
+
+    return ExcludeMatcher(exclude_patterns)
+
+# Everything the detectors need from a file, filled from a single stat() call
+FileRecord = namedtuple('FileRecord', ['path', 'name', 'size', 'mtime', 'mtime_ns', 'atime', 'ino', 'dev', 'nlink',
+                                       'blocks', 'ctime', 'birthtime'])
+
+# st_blocks is always in 512-byte units; Windows doesn't have it at all
+HAVE_ST_BLOCKS = hasattr(os.stat_result, 'st_blocks')
+
+# Birth times come with the normal stat on macOS / BSD / Windows. Linux only
+# has them through statx(2), which the walker then calls instead of stat -
+# only when a scan asks for them, it's slower from Python.
+HAVE_ST_BIRTHTIME = hasattr(os.stat_result, 'st_birthtime')
+BIRTHTIME_STAT = statx if HAVE_STATX and not HAVE_ST_BIRTHTIME else None
+
+# Timestamps the old file scan can go by (FileRecord fields)
+OLD_TIME_FIELDS = ('mtime', 'atime', 'ctime', 'birthtime')
+
+def _list_dir(root, rel_root='', exclude=None, stat=None):
+    # One readdir of `root`: returns the FileRecords of its files and the
+    # (path, rel_path) of the subdirectories worth descending into.
+    # Excluded entries are dropped here, so excluded dirs are never listed.
+    # stat(path), if given, replaces entry.stat() (see BIRTHTIME_STAT).
+    want_rel = exclude is not None and exclude.path_glob is not None
+    want_path = exclude is not None and exclude.wants_path
+    files = []
+    subdirs = []
     try:
-        for entry in sorted(os.listdir(path)):
-            full_path = os.path.join(path, entry)
-            if os.path.isdir(full_path):
-                subtree = bld_tree(full_path, max_depth, depth + 1, scanned_files)
-                tree.add(subtree)
-            else:
-                if scanned_files and full_path in scanned_files:
-                    status = scanned_files[full_path]
-                    if status.get('is_ghost'):
-                        tree.add(f"[magenta]📄 {entry}[/magenta]")
-                    elif status.get('is_large'):
-                        tree.add(f"[yellow]📄 {entry}[/yellow]")
-                    elif status.get('is_old'):
-                        tree.add(f"[red]📄 {entry}[/red]")
-                    elif status.get('is_duplicate'):
-                        tree.add(f"[blue]📄 {entry}[/blue]")
-                    else:
-                        tree.add(f"[green]📄 {entry}[/green]")
-                else:
-                    tree.add(f"📄 {entry}")
-    except Exception:
-        tree.add("[red]Permission Denied[/red]")
-    return tree
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return files, subdirs
+
+    for entry in entries:
+        rel_path = rel_root + entry.name if want_rel else None
+        if exclude is not None and exclude.match(entry.name, rel_path,
+                                                   os.path.abspath(entry.path) if want_path else None):
+            continue
+        try:
+            if entry.is_dir():
+                # like os.walk, don't descend into symlinked dirs
+                if not entry.is_symlink():
+                    subdirs.append((entry.path, rel_path + '/' if want_rel else ''))
+                continue
+            if entry.is_symlink():
+                # deleting a link frees nothing, and counting its target
+                # here would count it twice when it's in the tree too
+                continue
+            st = entry.stat(follow_symlinks=False) if stat is None else stat(entry.path)
+        except OSError:
+            continue
+        files.append(_make_record(entry.path, entry.name, st, HAVE_ST_BIRTHTIME or stat is not None))
+
+    return files, subdirs
+
+def _make_record(path, name, st, with_birthtime):
+    return FileRecord(path, name, st.st_size, st.st_mtime, st.st_mtime_ns,
+                      st.st_atime, st.st_ino, st.st_dev, st.st_nlink,
+                      st.st_blocks if HAVE_ST_BLOCKS else (st.st_size + 511) // 512,
+                      st.st_ctime,
+                      st.st_birthtime if with_birthtime else None)
+
+class SnapshotLister:
+    # Drop-in for _list_dir that reuses the previous run's listing of any
+    # directory whose mtime hasn't moved: no readdir, no exclude checks and
+    # no per-file stat, just one stat of the directory itself. Adding,
+    # removing or renaming an entry bumps the directory mtime, so those are
+    # always picked up. A file rewritten in place (no rename) keeps its old
+    # size and times until its directory changes for some other reason -
+    # only duplicate candidates are stat'ed again, before they're hashed
+    # (see find_duplicates' restat).
+    # Listings are kept as {dir: (mtime_ns, rows, subdirs)}, a row being a
+    # FileRecord without its path, which the directory already gives.
+    def __init__(self, previous, started_ns, list_dir=_list_dir):
+        self.previous = previous
+        self.list_dir = list_dir
+        self.current = {}
+        self.reused = 0
+        self.listed = 0
+        # Like git's racy-index check: a directory touched within the last
+        # couple of seconds may still change within the same mtime tick,
+        # so it isn't remembered and gets listed again next time
+        self.racy_ns = started_ns - 2 * 10**9
+
+    def __call__(self, root, rel_root='', exclude=None):
+        try:
+            mtime_ns = os.stat(root).st_mtime_ns
+        except OSError:
+            return [], []
+
+        prev = self.previous.get(root)
+        if prev is not None and prev[0] == mtime_ns:
+            self.reused += 1
+            self.current[root] = prev
+            prefix = os.path.join(root, '')
+            return [FileRecord(prefix + row[0], *row) for row in prev[1]], prev[2]
+
+        self.listed += 1
+        files, subdirs = self.list_dir(root, rel_root, exclude)
+        if mtime_ns < self.racy_ns:
+            self.current[root] = (mtime_ns, [record[1:] for record in files], subdirs)
+        return files, subdirs
+
+    def changed(self):
+        # Whether current differs from previous, i.e. is worth saving
+        return self.listed > 0 or len(self.current) != len(self.previous)
+
+def _walk(stack, exclude=None, list_dir=_list_dir):
+    while stack:
+        root, rel_root = stack.pop()
+        files, subdirs = list_dir(root, rel_root, exclude)
+        yield from files
+        stack.extend(reversed(subdirs))
+
+def walk_files(start_path, exclude=None, list_dir=_list_dir):
+    # os.scandir based walk: directory type comes from the readdir data and
+    # each file is stat'ed exactly once. Files of a directory are yielded
+    # before its subdirectories are entered, same order as os.walk().
+    return _walk([(start_path, '')], exclude, list_dir)
+
+class ScanTree:
+    # Directory tree for the live UI, built from the paths the scan reports -
+    # never lists the disk itself. Shows max_depth levels like the old
+    # bld_tree(). Rich calls __rich__ on every refresh tick; the Tree is only
+    # rebuilt when something changed since the last tick, and only from the
+    # first MAX_ENTRIES folders and files of each directory, MAX_LINES in
+    # all - a panel can't show more anyway, and a tick stays cheap however
+    # much was scanned.
+    STYLES = [('is_ghost', 'magenta'), ('is_large', 'yellow'), ('is_old', 'red'), ('is_duplicate', 'blue')]
+    MAX_ENTRIES = 10
+    MAX_LINES = 60
+
+    def __init__(self, root, max_depth=2):
+        self.root = root
+        self.prefix = os.path.join(root, '')
+        self.max_depth = max_depth
+        # node = (subdirs: {name: node}, files: {name: set of status flags})
+        self.nodes = ({}, {})
+        # the Live refresh thread renders while the scan keeps adding
+        self.lock = threading.Lock()
+        self.dirty = True
+        self.rendered = None
+        # paths come in directory by directory: the files dict of the last
+        # one is kept, so most adds are one dict lookup
+        self.last_parent = None
+        self.last_files = None
+
+    def _files_of(self, parent):
+        # The files dict of directory parent, or None when its files aren't
+        # shown (outside root or deeper than max_depth). Called under the lock.
+        rel = parent + os.sep
+        if not rel.startswith(self.prefix):
+            return None
+        node = self.nodes
+        for depth, dir_name in enumerate(rel[len(self.prefix):].split(os.sep)[:-1], start=1):
+            node = node[0].setdefault(dir_name, ({}, {}))
+            if depth >= self.max_depth:
+                # deep enough: the folder shows up, its files don't
+                self.dirty = True
+                return None
+        return node[1]
+
+    def add(self, path, flag=None):
+        parent, _, name = path.rpartition(os.sep)
+        with self.lock:
+            if parent != self.last_parent:
+                self.last_parent = parent
+                self.last_files = self._files_of(parent)
+            files = self.last_files
+            if files is None:
+                return
+            flags = files.get(name)
+            if flags is None:
+                flags = files[name] = set()
+                self.dirty = True
+            if flag is not None and flag not in flags:
+                flags.add(flag)
+                self.dirty = True
+
+    def _snapshot(self, node, budget):
+        # What _build shows of node: ({name: snapshot}, {name: flags}, how
+        # many entries are left out). budget is [lines left]. Taken under
+        # the lock, so it copies no more than gets drawn.
+        subdirs, files = node
+        shown_dirs = {}
+        shown_files = {}
+        for name, child in islice(subdirs.items(), self.MAX_ENTRIES):
+            if budget[0] <= 0:
+                break
+            budget[0] -= 1
+            shown_dirs[name] = self._snapshot(child, budget)
+        for name, flags in islice(files.items(), self.MAX_ENTRIES):
+            if budget[0] <= 0:
+                break
+            budget[0] -= 1
+            shown_files[name] = tuple(flags)
+        return shown_dirs, shown_files, len(subdirs) + len(files) - len(shown_dirs) - len(shown_files)
+
+    def _build(self, label, snapshot):
+        tree = Tree(f"📁 {label}")
+        subdirs, files, hidden = snapshot
+        entries = [(name, True) for name in subdirs] + [(name, False) for name in files]
+        for name, is_dir in sorted(entries):
+            if is_dir:
+                tree.add(self._build(name, subdirs[name]))
+                continue
+            style = 'green'
+            for flag, flag_style in self.STYLES:
+                if flag in files[name]:
+                    style = flag_style
+                    break
+            tree.add(f"[{style}]📄 {name}[/{style}]")
+        if hidden:
+            tree.add(f"[dim]… and {hidden:,} more[/dim]")
+        return tree
+
+    def __rich__(self):
+        with self.lock:
+            if not self.dirty and self.rendered is not None:
+                return self.rendered
+            snapshot = self._snapshot(self.nodes, [self.MAX_LINES])
+            self.dirty = False
+        # built outside the lock, the scan thread keeps adding meanwhile
+        self.rendered = self._build(os.path.basename(self.root) or self.root, snapshot)
+        return self.rendered
 
 def drw_r_panel(progress, scanned, ghost, large, old, duplicates, current_file=None):
     stats = Table.grid(padding=(0, 2))
@@ -112,25 +407,82 @@ def drw_r_panel(progress, scanned, ghost, large, old, duplicates, current_file=N
         Panel(stats, title="📊 Stats", border_style="green")
     )
 
+class ScanState:
+    # Counters the scan thread publishes for the UI. Only the scan thread
+    # writes them and each write is a single attribute store, so the UI can
+    # read them at any time without locking.
+    def __init__(self):
+        self.scanned = 0
+        self.ghosts = 0
+        self.large = 0
+        self.old = 0
+        self.duplicates = 0
+        self.current_file = None
+        self.done = False
+        self.error = None
+
+class StatsPanel:
+    # Right side of the live UI, redrawn from ScanState on every refresh tick
+    def __init__(self, state, progress, task):
+        self.state = state
+        self.progress = progress
+        self.task = task
+
+    def __rich__(self):
+        state = self.state
+        if state.done:
+            self.progress.update(self.task, total=state.scanned, completed=state.scanned)
+        else:
+            self.progress.update(self.task, completed=state.scanned)
+        return drw_r_panel(self.progress, state.scanned, state.ghosts, state.large,
+                           state.old, state.duplicates, current_file=state.current_file)
+
+def _run_scan(findings, results, store, state, tree):
+    # Body of the live UI's scan thread
+    status_keys = {"ghost": "is_ghost", "large": "is_large", "old": "is_old"}
+    try:
+        for finding in findings:
+            if finding.kind == "scanned":
+                path, count = finding.data
+                state.scanned += count
+                if path is not None:
+                    state.current_file = path
+                    tree.add(path)
+                continue
+
+            _collect(results, store, finding)
+            if finding.kind in ("hardlink", "directory", "stats", "ghost_rules"):
+                continue
+            if finding.kind == "duplicate":
+                state.duplicates += 1
+                for path in finding.data[1]:
+                    tree.add(path, 'is_duplicate')
+                continue
+
+            if finding.kind == "ghost":
+                state.ghosts += 1
+            elif finding.kind == "large":
+                state.large += 1
+            elif finding.kind == "old":
+                state.old += 1
+            tree.add(finding.data[0], status_keys[finding.kind])
+        state.current_file = None
+    except Exception as e:
+        state.error = e
+    finally:
+        state.done = True
+
 def scan_large_files(start_path, start_size=50 * 1024 * 1024, progress=False):
     sizes = []
     size = None
 
     if isdir(start_path):
-        all_files = []
-        for root, _, files in os.walk(start_path):
-            for name in files:
-                all_files.append(os.path.join(root, name))
-
+        all_files = list(walk_files(start_path))
         iterator = tqdm(all_files, desc="Scanning Large Files") if progress else all_files
 
-        for path in iterator:
-            try:
-                size = get_file_size(path)
-                if size > start_size:
-                    sizes.append((path, size))
-            except Exception:
-                continue
+        for record in iterator:
+            if record.size > start_size:
+                sizes.append((record.path, record.size))
     else:
         sizer = get_file_size(start_path)
         if sizer > 50 * 1024 * 1024:
@@ -142,20 +494,14 @@ def scan_old_files(start_path, progress=False):
     results = []
 
     if isdir(start_path):
-        all_files = []
-        for root, _, files in os.walk(start_path):
-            for name in files:
-                all_files.append(os.path.join(root, name))
-
+        all_files = list(walk_files(start_path))
         iterator = tqdm(all_files, desc="Scanning Old Files") if progress else all_files
 
-        for path in iterator:
-            try:
-                age = get_file_age(path)
-                if age > 180 * 24 * 3600:
-                    results.append((path, age))
-            except Exception:
-                continue
+        now = time.time()
+        for record in iterator:
+            age = now - record.mtime
+            if age > 180 * 24 * 3600:
+                results.append((record.path, age))
     else:
         age = get_file_age(start_path)
         if age > 180 * 24 * 3600:
@@ -163,29 +509,463 @@ def scan_old_files(start_path, progress=False):
 
     return results if len(results) > 1 else results[0] if len(results) > 0 else None
 
-def scan_duplicates(start_path, progress=False):
-    hashes = {}
-    dups = {}
+def _cache_key(record):
+    return (record.dev, record.ino, record.size, record.mtime_ns)
 
-    all_files = []
-    for root, _, files in os.walk(start_path):
-        for name in files:
-            all_files.append(os.path.join(root, name))
+def _group_by_hash(files, hash_func, workers=1, progress=False, desc=None):
+    # files is a list of FileRecords; groups come back keyed on (size, hash)
+    results = map_bounded(hash_func, files, workers=workers)
+    if progress:
+        results = tqdm(results, total=len(files), desc=desc)
 
-    iterator = tqdm(all_files, desc="Scanning Duplicates") if progress else all_files
+    groups = {}
+    for record, file_hash, error in results:
+        if error is None:
+            groups.setdefault((record.size, file_hash), []).append(record)
+    return groups
 
-    for full_path in iterator:
-        try:
-            h = hash_file(full_path)
-            if h in hashes:
-                dups.setdefault(h, [hashes[h]]).append(full_path)
-            else:
-                hashes[h] = full_path
-        except Exception:
+def _group_by_size(files):
+    # {size: [records]}, leaving out empty files and every path of a
+    # hardlinked inode but the first
+    by_size = {}
+    seen_inodes = set()
+    for record in files:
+        if record.size == 0:
+            continue
+        if record.nlink > 1:
+            inode = (record.dev, record.ino)
+            if inode in seen_inodes:
+                continue
+            seen_inodes.add(inode)
+        by_size.setdefault(record.size, []).append(record)
+    return by_size
+
+def _restat_record(record):
+    # record with what lstat says now, or None if it's gone / no file
+    try:
+        st = os.lstat(record.path)
+    except OSError:
+        return None
+    if not S_ISREG(st.st_mode):
+        return None
+    return _make_record(record.path, record.name, st, False)
+
+def find_duplicates(files, hash_algo='md5', progress=False, workers=1, cache=None, restat=False):
+    # Staged duplicate search, cheapest check first:
+    #   1. group by size (no I/O at all)
+    #   2. hash the head + tail of files whose sizes collide
+    #   3. full hash only what still collides after that
+    # Empty files and files with a unique size are never opened.
+    # Hashing in both stages runs on a bounded pool of `workers` threads,
+    # and goes through the persistent hash cache when one is given.
+    # Hardlinks share one inode, so only its first path is considered -
+    # they are reported as hardlink groups instead (see find_hardlinks).
+    # restat: files may have changed since they were stat'ed (records from
+    # an incremental scan's snapshot) - those whose sizes collide are
+    # stat'ed again, so sizes and hash cache keys are the current ones.
+    by_size = _group_by_size(files)
+    candidates = [record for records in by_size.values() if len(records) > 1 for record in records]
+    if restat:
+        by_size = _group_by_size(record for record in map(_restat_record, candidates) if record is not None)
+        candidates = [record for records in by_size.values() if len(records) > 1 for record in records]
+    partial = _group_by_hash(candidates,
+                             lambda r: hash_file_partial(r.path, r.size, algorithm=hash_algo,
+                                                         cache=cache, key=_cache_key(r)),
+                             workers=workers, progress=progress, desc="Hashing Candidates")
+
+    dups = {}
+    full_candidates = []
+    for (size, partial_hash), records in partial.items():
+        if len(records) < 2:
             continue
+        if size <= 2 * PARTIAL_HASH_SIZE:
+            # the partial hash already covered the whole file
+            dups.setdefault(partial_hash, []).extend(r.path for r in records)
+        else:
+            full_candidates.extend(records)
+
+    full = _group_by_hash(full_candidates,
+                          lambda r: hash_file(r.path, algorithm=hash_algo,
+                                              cache=cache, key=_cache_key(r)),
+                          workers=workers, progress=progress, desc="Hashing Duplicates")
+    for (size, file_hash), records in full.items():
+        if len(records) > 1:
+            dups.setdefault(file_hash, []).extend(r.path for r in records)
 
     return dups
 
+def find_hardlinks(links):
+    # links: {(st_dev, st_ino): [records]} of every file with st_nlink > 1.
+    # Only inodes reached through more than one path inside the scan count.
+    return {f"{dev}:{ino}": [record.path for record in records]
+            for (dev, ino), records in links.items() if len(records) > 1}
+
+def _find_duplicates_cached(files, hash_algo, progress=False, workers=1, use_cache=True, rebuild_cache=False,
+                            restat=False):
+    cache = open_hash_cache(rebuild=rebuild_cache) if use_cache else None
+    try:
+        return find_duplicates(files, hash_algo=hash_algo, progress=progress, workers=workers, cache=cache,
+                               restat=restat)
+    finally:
+        if cache is not None:
+            cache.close()
+
+def scan_duplicates(start_path, progress=False, workers=1, use_cache=True):
+    return _find_duplicates_cached(list(walk_files(start_path)), 'md5', progress=progress,
+                                   workers=workers, use_cache=use_cache)
+
+
+ScanOptions = namedtuple('ScanOptions', ['scan_ghosts', 'scan_large', 'scan_old', 'scan_duplicates',
+                                         'large_threshold', 'old_threshold', 'large_top', 'old_time',
+                                         'ghost_rules'])
+
+def _lister_for(opts):
+    # The walker's _list_dir for these options
+    if opts.scan_old and opts.old_time == 'birthtime' and BIRTHTIME_STAT is not None:
+        return partial(_list_dir, stat=BIRTHTIME_STAT)
+    return _list_dir
+
+# What iter_scan() yields. kind / data:
+#   'ghost'     -> (path, size, age)
+#   'large'     -> (path, size)
+#   'old'       -> (path, age)
+#   'duplicate' -> (hash, [paths])
+#   'hardlink'  -> ("dev:ino", [paths]) one inode reached through several paths
+#   'directory' -> (path, DirTotals) space used by everything under a
+#                  directory, one per directory once the walk is done
+#   'stats'     -> ScanStats size / age / extension distribution of every
+#                  walked file, once the walk is done
+#   'ghost_rules' -> [(rule, files, bytes)] ghost files each rule caught,
+#                  most files first, once the walk is done
+#   'scanned'   -> (path, count) progress tick, only with with_progress=True;
+#                  path is None when a whole subtree was done by a worker
+# ghost / large / old findings also carry stat = (size, mtime) of the file,
+# whatever the detector itself reports, so every stored row has both
+Finding = namedtuple('Finding', ['kind', 'data', 'stat'], defaults=(None,))
+
+# Finding kind -> results dict key
+RESULT_KEYS = {"ghost": "ghosts", "large": "large", "old": "old", "duplicate": "duplicates", "hardlink": "hardlinks",
+               "directory": "directories"}
+
+class ScanTally:
+    # Per-scan (or per-worker) state that only makes sense once the walk is
+    # done: duplicate candidates, multiply-linked inodes, the per-directory
+    # space totals, histograms and the top-N largest files. Workers each
+    # fill their own and the parent merges them in walk order.
+    def __init__(self, top_n=None, worker=False):
+        # a worker's stats leave out multiply-linked files: another worker
+        # may have the same inode, only the parent's merge can tell
+        self.worker = worker
+        self.dup_candidates = []
+        self.links = {}
+        # {dir: [size, blocks, files]} of the files directly inside it
+        self.dirs = {}
+        # min-heap of (size, path, mtime) holding the top_n largest files so far -
+        # the smallest of them is top[0], the one a bigger file pushes out
+        self.top_n = top_n
+        self.top = []
+        self.stats = ScanStats()
+        # {ghost rule index: [files, bytes]}
+        self.rule_hits = {}
+
+    def add_to_top(self, size, path, mtime):
+        if len(self.top) < self.top_n:
+            heapq.heappush(self.top, (size, path, mtime))
+        elif self.top and size > self.top[0][0]:
+            heapq.heapreplace(self.top, (size, path, mtime))
+
+    def largest(self):
+        # [(path, size, mtime)], biggest first
+        return [(path, size, mtime) for size, path, mtime in sorted(self.top, reverse=True)]
+
+    def add_to_dir(self, record, sign=1):
+        parent = record.path[:len(record.path) - len(record.name) - 1] or os.sep
+        totals = self.dirs.get(parent)
+        if totals is None:
+            totals = self.dirs[parent] = [0, 0, 0]
+        totals[0] += sign * record.size
+        totals[1] += sign * record.blocks
+        totals[2] += sign
+
+    def merge(self, other, now):
+        self.dup_candidates.extend(other.dup_candidates)
+        for inode, records in other.links.items():
+            if inode in self.links:
+                # an earlier unit already counted this inode's space
+                other.add_to_dir(records[0], -1)
+            else:
+                first = records[0]
+                self.stats.add(first.size, now - first.mtime, first.name)
+            self.links.setdefault(inode, []).extend(records)
+        for size, path, mtime in other.top:
+            self.add_to_top(size, path, mtime)
+        self.stats.merge(other.stats)
+        for index, (files, nbytes) in other.rule_hits.items():
+            hits = self.rule_hits.setdefault(index, [0, 0])
+            hits[0] += files
+            hits[1] += nbytes
+        for path, (size, blocks, files) in other.dirs.items():
+            totals = self.dirs.get(path)
+            if totals is None:
+                self.dirs[path] = [size, blocks, files]
+            else:
+                totals[0] += size
+                totals[1] += blocks
+                totals[2] += files
+
+    def directory_totals(self, root):
+        # Rolls the per-directory counts up into their parents, deepest
+        # first, stopping at root: {dir: DirTotals} of each whole subtree
+        root = root.rstrip(os.sep) or os.sep
+        totals = {path: list(counts) for path, counts in self.dirs.items()}
+        # a parent path is always shorter than its children, so going
+        # longest first every directory is complete before it's passed up
+        pending = [(-len(path), path) for path in totals]
+        heapq.heapify(pending)
+        while pending:
+            _, path = heapq.heappop(pending)
+            if path == root:
+                continue
+            parent = os.path.dirname(path)
+            if len(parent) < len(root):
+                continue
+            counts = totals[path]
+            parent_totals = totals.get(parent)
+            if parent_totals is None:
+                totals[parent] = list(counts)
+                heapq.heappush(pending, (-len(parent), parent))
+            else:
+                parent_totals[0] += counts[0]
+                parent_totals[1] += counts[1]
+                parent_totals[2] += counts[2]
+        return {path: DirTotals(size, blocks * 512, files)
+                for path, (size, blocks, files) in totals.items()}
+
+def _classify(record, now, opts, emit, tally):
+    # Runs every enabled detector on one record and emits its findings
+    size = record.size
+    age = now - record.mtime
+
+    if opts.scan_ghosts:
+        rule = opts.ghost_rules.match(record.name, record.path)
+        if rule is not None:
+            hits = tally.rule_hits.get(rule)
+            if hits is None:
+                hits = tally.rule_hits[rule] = [0, 0]
+            hits[0] += 1
+            hits[1] += size
+            emit(Finding("ghost", (record.path, size, age), (size, record.mtime)))
+
+    if opts.scan_large and size > opts.large_threshold:
+        if opts.large_top is not None:
+            # only known once the walk is over, see iter_scan()
+            tally.add_to_top(size, record.path, record.mtime)
+        else:
+            emit(Finding("large", (record.path, size), (size, record.mtime)))
+
+    if opts.scan_old:
+        old_age = age
+        if opts.old_time != 'mtime':
+            when = getattr(record, opts.old_time)
+            # no birth time on this filesystem: go by mtime rather than
+            # calling nothing old
+            if when is not None:
+                old_age = now - when
+        if old_age > opts.old_threshold:
+            emit(Finding("old", (record.path, old_age), (size, record.mtime)))
+
+    if opts.scan_duplicates:
+        tally.dup_candidates.append(record)
+
+    if record.nlink > 1:
+        # every name of a hardlinked file shares its blocks - count them once
+        inode = (record.dev, record.ino)
+        if inode not in tally.links:
+            tally.add_to_dir(record)
+            if not tally.worker:
+                tally.stats.add(size, age, record.name)
+        tally.links.setdefault(inode, []).append(record)
+    else:
+        tally.add_to_dir(record)
+        tally.stats.add(size, age, record.name)
+
+def _scan_records(records, now, opts, tally, with_progress=False):
+    findings = []
+    for record in records:
+        _classify(record, now, opts, findings.append, tally)
+        if findings:
+            yield from findings
+            findings.clear()
+        if with_progress:
+            yield Finding("scanned", (record.path, 1))
+
+def _scan_tree(unit):
+    # Process pool worker: walk + classify a whole subtree
+    root, rel_root, exclude, now, opts = unit
+    findings = []
+    tally = ScanTally(opts.large_top, worker=True)
+    scanned = 0
+    for record in _walk([(root, rel_root)], exclude, _lister_for(opts)):
+        _classify(record, now, opts, findings.append, tally)
+        scanned += 1
+    return findings, tally, scanned
+
+def _plan_units(start_path, exclude, processes, list_dir=_list_dir):
+    # Splits the tree into an ordered list of work units. A unit is either
+    # ('files', records) - files already listed here by the parent - or
+    # ('tree', path, rel_path) - a subtree for a worker to walk. Big top
+    # levels are expanded a couple of levels down so there are enough units
+    # to keep every worker busy. Unit order follows walk_files() order, so
+    # merging in plan order gives exactly the serial result.
+    files, subdirs = list_dir(start_path, '', exclude)
+    plan = [('files', files)] + [('tree', path, rel) for path, rel in subdirs]
+
+    for _ in range(2):
+        trees = sum(1 for unit in plan if unit[0] == 'tree')
+        if trees == 0 or trees >= processes * 4:
+            break
+        expanded = []
+        for unit in plan:
+            if unit[0] == 'tree':
+                files, subdirs = list_dir(unit[1], unit[2], exclude)
+                expanded.append(('files', files))
+                expanded.extend(('tree', path, rel) for path, rel in subdirs)
+            else:
+                expanded.append(unit)
+        plan = expanded
+
+    return plan
+
+def _scan_parallel(start_path, exclude, now, opts, processes, tally, with_progress=False):
+    # Findings come out unit by unit, in walk order, while the pool works
+    # ahead on the remaining subtrees
+    plan = _plan_units(start_path, exclude, processes, _lister_for(opts))
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_scan_tree, (unit[1], unit[2], exclude, now, opts))
+                   if unit[0] == 'tree' else None
+                   for unit in plan]
+
+        for unit, future in zip(plan, futures):
+            if future is None:
+                yield from _scan_records(unit[1], now, opts, tally, with_progress)
+                continue
+            findings, unit_tally, scanned = future.result()
+            yield from findings
+            tally.merge(unit_tally, now)
+            if with_progress:
+                yield Finding("scanned", (None, scanned))
+
+def iter_scan(start_path,
+              large_threshold=50 * 1024 * 1024,
+              old_threshold=180 * 24 * 3600,
+              scan_ghosts=True,
+              scan_large=True,
+              scan_old=True,
+              scan_duplicates=True,
+              hash_algo='md5',
+              exclude_patterns=None,
+              workers=1,
+              processes=1,
+              use_cache=True,
+              rebuild_cache=False,
+              incremental=False,
+              with_progress=False,
+              progress=False,
+              now=None,
+              large_top=None,
+              old_time='mtime',
+              ghost_rules=None):
+    # Streaming scan: ghost / large / old findings come out while the walk
+    # is still running, duplicate groups once hashing is done (that needs
+    # every file's size first). See Finding for what gets yielded.
+    # With large_top=N, 'large' is instead the N biggest files over
+    # large_threshold: kept in a bounded heap during the walk (memory stays
+    # O(N) however big the tree) and yielded, biggest first, after it.
+    # old_time picks the timestamp the old file scan goes by, one of
+    # OLD_TIME_FIELDS - they all come from the walker's single stat.
+    # ghost_rules adds to the default ghost patterns (see build_ghost_rules).
+    if old_time not in OLD_TIME_FIELDS:
+        raise ValueError(f"Unknown old_time: {old_time}")
+    rules = build_ghost_rules(ghost_rules) if scan_ghosts else None
+    opts = ScanOptions(scan_ghosts, scan_large, scan_old, scan_duplicates,
+                       large_threshold, old_threshold, large_top, old_time, rules)
+    exclude = build_exclude_matcher(exclude_patterns)
+    list_dir = _lister_for(opts)
+    if scan_duplicates:
+        # fail before walking rather than silently hashing nothing
+        hash_algo = resolve_hash_algorithm(hash_algo)
+        get_hasher(hash_algo)
+    # ages are measured from now - scan_all passes its own so results can
+    # turn them back into mtimes
+    if now is None:
+        now = time.time()
+    tally = ScanTally(large_top)
+
+    if incremental:
+        # snapshots already skip most of the work, the walk stays serial
+        signature = exclude.signature()
+        if list_dir is not _list_dir:
+            # records without birth times are no use to this scan
+            signature += '\0birthtime'
+        lister = SnapshotLister(load_snapshot(start_path, signature), time.time_ns(), list_dir)
+        yield from _scan_records(walk_files(start_path, exclude=exclude, list_dir=lister),
+                                 now, opts, tally, with_progress)
+        if lister.changed():
+            save_snapshot(start_path, signature, lister.current)
+    elif processes > 1:
+        yield from _scan_parallel(start_path, exclude, now, opts, processes, tally, with_progress)
+    else:
+        yield from _scan_records(walk_files(start_path, exclude=exclude, list_dir=list_dir),
+                                 now, opts, tally, with_progress)
+
+    for path, size, mtime in tally.largest():
+        yield Finding("large", (path, size), (size, mtime))
+
+    for path, totals in tally.directory_totals(start_path).items():
+        yield Finding("directory", (path, totals))
+    tally.stats.flush()
+    yield Finding("stats", tally.stats)
+    if scan_ghosts:
+        hits = sorted(tally.rule_hits.items(), key=lambda item: (-item[1][0], item[0]))
+        yield Finding("ghost_rules", [(rules.rules[index], files, nbytes) for index, (files, nbytes) in hits])
+
+    for inode, paths in find_hardlinks(tally.links).items():
+        yield Finding("hardlink", (inode, paths))
+
+    if scan_duplicates:
+        dups = _find_duplicates_cached(tally.dup_candidates, hash_algo, progress=progress, workers=workers,
+                                       use_cache=use_cache, rebuild_cache=rebuild_cache, restat=incremental)
+        for file_hash, paths in dups.items():
+            yield Finding("duplicate", (file_hash, paths))
+
+def _collect(results, store, finding):
+    if finding.kind in ("stats", "ghost_rules"):
+        results[finding.kind] = finding.data
+    elif finding.kind in ("duplicate", "hardlink", "directory"):
+        key, value = finding.data
+        results[RESULT_KEYS[finding.kind]][key] = value
+    else:
+        store.add(finding.kind, finding.data, finding.stat)
+
+def _tee_findings(findings, on_finding):
+    for finding in findings:
+        if finding.kind != "scanned":
+            on_finding(finding)
+        yield finding
+
+def stream_scan(start_path, on_finding, progress=False, **scan_args):
+    # scan_all(on_finding=...) without the results: every finding goes to
+    # on_finding and none is kept, for callers that only write a streaming
+    # report. scan_args are iter_scan's.
+    bar = tqdm(desc="Full Scan", unit=" files") if progress else None
+    for finding in iter_scan(start_path, with_progress=progress, progress=progress, **scan_args):
+        if finding.kind == "scanned":
+            bar.update(finding.data[1])
+        else:
+            on_finding(finding)
+    if bar is not None:
+        bar.close()
 
 def scan_all(start_path, progress=False, live_ui=False, 
              large_threshold=50 * 1024 * 1024,  # 50MB default
@@ -195,128 +975,110 @@ def scan_all(start_path, progress=False, live_ui=False,
              scan_old=True,
              scan_duplicates=True,
              hash_algo='md5',
-             exclude_patterns=None):
+             exclude_patterns=None,
+             workers=1,
+             processes=1,
+             use_cache=True,
+             rebuild_cache=False,
+             incremental=False,
+             on_finding=None,
+             large_top=None,
+             old_time='mtime',
+             ghost_rules=None):
+    # on_finding(finding) is called for every finding as it's made (not for
+    # "scanned" progress ticks) - e.g. NdjsonWriter.write_finding to stream
+    # a report out while the scan runs
+
+    if scan_duplicates:
+        hash_algo = resolve_hash_algorithm(hash_algo)
 
+    # ghosts / large / old live in a column store; the dict holds list-like
+    # views over it that iterate as the usual tuples
+    # top-N large files only turn up after the walk, away from the file's
+    # other findings
+    store = ResultStore(late_kinds=("large",) if large_top is not None else ())
+    scanned_at = time.time()
     results = {
-        "ghosts": [],
-        "large": [],
-        "old": [],
-        "duplicates": {}
+        "ghosts": store.views["ghost"],
+        "large": store.views["large"],
+        "old": store.views["old"],
+        "duplicates": {},
+        "hardlinks": {},
+        # {dir: DirTotals}, du-style, for every directory under start_path
+        "directories": {},
+        # ScanStats histograms of everything walked
+        "stats": None,
+        # [(rule, files, bytes)] hit counts of the ghost rules
+        "ghost_rules": [],
+        # duplicate hashes are only comparable within one algorithm
+        "hash_algo": hash_algo if scan_duplicates else None,
+        # reference point of every age above (mtime = scanned_at - age)
+        "scanned_at": scanned_at,
+        # what the old file ages are measured from
+        "old_time": old_time if scan_old else None
     }
-    hashes = {}
-    scanned_files = {}
 
-    # Combine default exclusions with user's ones
-    if exclude_patterns is None:
-        exclude_patterns = DEFAULT_EXCLUDE_PATTERNS
-    elif isinstance(exclude_patterns, str):
-        try:
-            with open(exclude_patterns, 'r') as f:
-                user_patterns = [line.strip() for line in f if line.strip()]
-            exclude_patterns = DEFAULT_EXCLUDE_PATTERNS + user_patterns
-        except Exception:
-            exclude_patterns = DEFAULT_EXCLUDE_PATTERNS + [exclude_patterns]
-    else:
-        exclude_patterns = DEFAULT_EXCLUDE_PATTERNS + exclude_patterns
-
-    all_files = []
-    for root, _, files in os.walk(start_path):
-        # Skip excluded dirs
-        if any(pattern in root for pattern in exclude_patterns):
-            continue
-            
-        for name in files:
-            full_path = os.path.join(root, name)
-            # Skip excluded files
-            if any(pattern in full_path or name.endswith(pattern.lstrip('*')) for pattern in exclude_patterns):
-                continue
-            all_files.append(full_path)
+    findings = iter_scan(start_path,
+                         large_threshold=large_threshold,
+                         old_threshold=old_threshold,
+                         scan_ghosts=scan_ghosts,
+                         scan_large=scan_large,
+                         scan_old=scan_old,
+                         scan_duplicates=scan_duplicates,
+                         hash_algo=hash_algo,
+                         exclude_patterns=exclude_patterns,
+                         workers=workers,
+                         processes=processes,
+                         use_cache=use_cache,
+                         rebuild_cache=rebuild_cache,
+                         incremental=incremental,
+                         with_progress=live_ui or progress,
+                         progress=progress and not live_ui,
+                         now=scanned_at,
+                         large_top=large_top,
+                         old_time=old_time,
+                         ghost_rules=ghost_rules)
+    if on_finding is not None:
+        findings = _tee_findings(findings, on_finding)
 
     if live_ui:
+        state = ScanState()
+        tree = ScanTree(start_path)
         progress_bar = Progress(
             BarColumn(),
             TaskProgressColumn(),
             TimeElapsedColumn(),
             expand=True
         )
-        task = progress_bar.add_task("Scan", total=len(all_files))
+        # the total isn't known until the walk is over
+        task = progress_bar.add_task("Scan", total=None)
         
         layout = Layout()
         layout.split_row(
-            Layout(Panel(bld_tree(start_path, scanned_files=scanned_files), title="📁 Directory Tree", border_style="magenta"), name="left", ratio=2),
-            Layout(name="right", ratio=3)
+            Layout(Panel(tree, title="📁 Directory Tree", border_style="magenta"), name="left", ratio=2),
+            Layout(Panel(StatsPanel(state, progress_bar, task), border_style="cyan"), name="right", ratio=3)
         )
 
-        scanned = ghost = large = old = duplicates = 0
-
+        # The scan runs on its own thread and only writes to state / tree;
+        # Live repaints from them on its own 10 fps timer, so rendering
+        # never slows the scan down
+        scan_thread = threading.Thread(target=_run_scan, args=(findings, results, store, state, tree), daemon=True)
         with Live(layout, refresh_per_second=10, screen=True):
-            for path in all_files:
-                try:
-                    size = get_file_size(path)
-                    age = get_file_age(path)
-                    ext = os.path.splitext(path)[1].lower()
-                    file_status = {}
-
-                    if scan_ghosts and ext in GHOSTY_EXTENSIONS:
-                        results["ghosts"].append((path, size, age))
-                        ghost += 1
-                        file_status['is_ghost'] = True
-                    
-                    if scan_large and size > large_threshold:
-                        results["large"].append((path, size))
-                        large += 1
-                        file_status['is_large'] = True
-                    
-                    if scan_old and age > old_threshold:
-                        results["old"].append((path, age))
-                        old += 1
-                        file_status['is_old'] = True
-                    
-                    if scan_duplicates:
-                        file_hash = hash_file(path, algorithm=hash_algo)
-                        if file_hash in hashes:
-                            if file_hash not in results["duplicates"]:
-                                results["duplicates"][file_hash] = [hashes[file_hash]]
-                                duplicates += 1
-                            results["duplicates"][file_hash].append(path)
-                            file_status['is_duplicate'] = True
-                        else:
-                            hashes[file_hash] = path
-                    
-                    scanned_files[path] = file_status
-                except Exception:
-                    continue
-                finally:
-                    scanned += 1
-                    progress_bar.update(task, advance=1)
-                    layout["left"].update(Panel(bld_tree(start_path, scanned_files=scanned_files), title="📁 Directory Tree", border_style="magenta"))
-                    right_panel = drw_r_panel(progress_bar, scanned, ghost, large, old, duplicates, current_file=path)
-                    layout["right"].update(Panel(right_panel, border_style="cyan"))
-        
+            scan_thread.start()
+            while scan_thread.is_alive():
+                scan_thread.join(0.1)
+
+        if state.error is not None:
+            raise state.error
+
     else:
-        iterator = tqdm(all_files, desc="Full Scan") if progress else all_files
-        for path in iterator:
-            try:
-                size = get_file_size(path)
-                age = get_file_age(path)
-                ext = os.path.splitext(path)[1].lower()
-
-                if scan_ghosts and ext in GHOSTY_EXTENSIONS:
-                    results["ghosts"].append((path, size, age))
-                
-                if scan_large and size > large_threshold:
-                    results["large"].append((path, size))
-                
-                if scan_old and age > old_threshold:
-                    results["old"].append((path, age))
-                
-                if scan_duplicates:
-                    file_hash = hash_file(path, algorithm=hash_algo)
-                    if file_hash in hashes:
-                        results["duplicates"].setdefault(file_hash, []).append(path)
-                    else:
-                        hashes[file_hash] = path
-            except Exception:
-                continue
+        bar = tqdm(desc="Full Scan", unit=" files") if progress else None
+        for finding in findings:
+            if finding.kind == "scanned":
+                bar.update(finding.data[1])
+            else:
+                _collect(results, store, finding)
+        if bar is not None:
+            bar.close()
 
     return results
@@ -0,0 +1,41 @@
+import os
+import pickle
+import hashlib
+
+from hashcache import CACHE_DIR
+
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, 'snapshots')
+SNAPSHOT_VERSION = 5
+
+
+def snapshot_path(start_path, signature):
+    # One snapshot per scan root and exclusion set
+    key = hashlib.sha1(f"{os.path.abspath(start_path)}\0{signature}".encode()).hexdigest()
+    return os.path.join(SNAPSHOT_DIR, f"{key}.pickle")
+
+
+def load_snapshot(start_path, signature):
+    # Returns {dir_path: (mtime_ns, rows, subdirs)} (see SnapshotLister) or {} if there is no
+    # usable snapshot - a missing or broken one just means a full walk
+    try:
+        with open(snapshot_path(start_path, signature), 'rb') as f:
+            data = pickle.load(f)
+        if data.get('version') != SNAPSHOT_VERSION:
+            return {}
+        return data['dirs']
+    except Exception:
+        return {}
+
+
+def save_snapshot(start_path, signature, dirs):
+    path = snapshot_path(start_path, signature)
+    tmp_path = f"{path}.tmp"
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': SNAPSHOT_VERSION, 'dirs': dirs}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # write-then-rename so a crash never leaves half a snapshot behind
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,151 @@
+import bisect
+import heapq
+from array import array
+
+# numpy is optional - with it each chunk of sizes / ages is bucketed in a
+# few vectorized calls, without it in a plain loop over the same arrays
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Files are buffered into arrays and bucketed this many at a time, so
+# memory stays flat however many files a scan walks
+STATS_CHUNK = 64 * 1024
+
+# Size buckets grow 4x each: bucket 0 is empty files, bucket b >= 1 holds
+# sizes in [4**(b-1), 4**b). 32 buckets go past 1 EB.
+SIZE_BUCKETS = 32
+
+# Age bucket edges in days: "< 1 day", "1 day - 1 week", ..., "> 5 years"
+AGE_EDGES = (1, 7, 30, 90, 180, 365, 730, 1825)
+AGE_LABELS = ("< 1 day", "1 day - 1 week", "1 week - 1 month", "1 - 3 months", "3 - 6 months",
+              "6 - 12 months", "1 - 2 years", "2 - 5 years", "> 5 years")
+
+DAY = 24 * 3600
+
+
+def size_bucket_range(bucket):
+    # (min, max) bytes of a size bucket, max exclusive
+    if bucket == 0:
+        return (0, 1)
+    return (4 ** (bucket - 1), 4 ** bucket)
+
+
+class ScanStats:
+    # Size / age / extension distribution of every file a scan walks, not
+    # only the ones that got reported. Filled one file at a time from the
+    # walk (ScanTally keeps one), merged across worker processes.
+    def __init__(self):
+        self.size_files = [0] * SIZE_BUCKETS
+        self.size_bytes = [0] * SIZE_BUCKETS
+        self.age_files = [0] * len(AGE_LABELS)
+        self.age_bytes = [0] * len(AGE_LABELS)
+        self.extensions = {}  # ext -> [files, bytes]
+        self._sizes = array('q')
+        self._ages = array('d')
+
+    def add(self, size, age, name):
+        self._sizes.append(size)
+        self._ages.append(age)
+        dot = name.rfind('.')
+        ext = name[dot:].lower() if dot > 0 else ''
+        totals = self.extensions.get(ext)
+        if totals is None:
+            self.extensions[ext] = [1, size]
+        else:
+            totals[0] += 1
+            totals[1] += size
+        if len(self._sizes) >= STATS_CHUNK:
+            self.flush()
+
+    def flush(self):
+        # Buckets whatever is buffered
+        if not self._sizes:
+            return
+        if np is not None:
+            self._flush_numpy()
+        else:
+            self._flush_python()
+        self._sizes = array('q')
+        self._ages = array('d')
+
+    def _flush_numpy(self):
+        sizes = np.frombuffer(self._sizes, dtype=np.int64)
+        ages = np.frombuffer(self._ages, dtype=np.float64)
+
+        # frexp's exponent is exactly size.bit_length() (0 for empty
+        # files), unlike log2 which rounds up just below a power of two
+        buckets = (np.frexp(sizes.astype(np.float64))[1].astype(np.int64) + 1) // 2
+        np.minimum(buckets, SIZE_BUCKETS - 1, out=buckets)
+        files = np.bincount(buckets, minlength=SIZE_BUCKETS)
+        nbytes = np.bincount(buckets, weights=sizes, minlength=SIZE_BUCKETS)
+        for i in np.flatnonzero(files):
+            self.size_files[i] += int(files[i])
+            self.size_bytes[i] += int(nbytes[i])
+
+        age_buckets = np.searchsorted(np.array(AGE_EDGES, dtype=np.float64) * DAY, ages, side='right')
+        files = np.bincount(age_buckets, minlength=len(AGE_LABELS))
+        nbytes = np.bincount(age_buckets, weights=sizes, minlength=len(AGE_LABELS))
+        for i in np.flatnonzero(files):
+            self.age_files[i] += int(files[i])
+            self.age_bytes[i] += int(nbytes[i])
+
+    def _flush_python(self):
+        age_edges = [edge * DAY for edge in AGE_EDGES]
+        for size, age in zip(self._sizes, self._ages):
+            bucket = min((size.bit_length() + 1) // 2, SIZE_BUCKETS - 1)
+            self.size_files[bucket] += 1
+            self.size_bytes[bucket] += size
+            bucket = bisect.bisect_right(age_edges, age)
+            self.age_files[bucket] += 1
+            self.age_bytes[bucket] += size
+
+    def merge(self, other):
+        self.flush()
+        other.flush()
+        for i in range(SIZE_BUCKETS):
+            self.size_files[i] += other.size_files[i]
+            self.size_bytes[i] += other.size_bytes[i]
+        for i in range(len(AGE_LABELS)):
+            self.age_files[i] += other.age_files[i]
+            self.age_bytes[i] += other.age_bytes[i]
+        for ext, (files, nbytes) in other.extensions.items():
+            totals = self.extensions.get(ext)
+            if totals is None:
+                self.extensions[ext] = [files, nbytes]
+            else:
+                totals[0] += files
+                totals[1] += nbytes
+
+    def size_histogram(self):
+        # [(min, max, files, bytes)] from the smallest to the biggest
+        # non-empty bucket
+        self.flush()
+        used = [i for i, count in enumerate(self.size_files) if count]
+        if not used:
+            return []
+        return [size_bucket_range(i) + (self.size_files[i], self.size_bytes[i])
+                for i in range(used[0], used[-1] + 1)]
+
+    def age_histogram(self):
+        # [(label, files, bytes)], newest first
+        self.flush()
+        return list(zip(AGE_LABELS, self.age_files, self.age_bytes))
+
+    def top_extensions(self, n=10):
+        # [(extension, files, bytes)] taking up the most bytes; files
+        # without an extension show up as ''
+        top = heapq.nlargest(n, self.extensions.items(), key=lambda item: item[1][1])
+        return [(ext, files, nbytes) for ext, (files, nbytes) in top]
+
+    def as_dict(self, top_extensions=20):
+        # JSON-friendly version for the exporters
+        return {
+            "size_histogram": [{"min": lo, "max": hi, "files": files, "bytes": nbytes}
+                               for lo, hi, files, nbytes in self.size_histogram()],
+            "age_histogram": [{"age": label, "files": files, "bytes": nbytes}
+                              for label, files, nbytes in self.age_histogram()],
+            "extensions": [{"extension": ext, "files": files, "bytes": nbytes}
+                           for ext, files, nbytes in self.top_extensions(top_extensions)],
+        }
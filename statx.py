@@ -0,0 +1,87 @@
+import os
+import sys
+import ctypes
+from collections import namedtuple
+
+# Linux statx(2) through ctypes. os.stat() has no birth time on Linux, so
+# when a scan wants one the walker calls this *instead of* its usual stat -
+# still one syscall per file. Needs glibc 2.28+ (statx() wrapper).
+
+AT_FDCWD = -100
+AT_SYMLINK_NOFOLLOW = 0x100
+STATX_BASIC_STATS = 0x7ff
+STATX_BTIME = 0x800
+
+
+class _Timestamp(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_int64), ('tv_nsec', ctypes.c_uint32), ('reserved', ctypes.c_int32)]
+
+
+class _Statx(ctypes.Structure):
+    # struct statx from <linux/stat.h>, 256 bytes
+    _fields_ = [
+        ('stx_mask', ctypes.c_uint32),
+        ('stx_blksize', ctypes.c_uint32),
+        ('stx_attributes', ctypes.c_uint64),
+        ('stx_nlink', ctypes.c_uint32),
+        ('stx_uid', ctypes.c_uint32),
+        ('stx_gid', ctypes.c_uint32),
+        ('stx_mode', ctypes.c_uint16),
+        ('spare0', ctypes.c_uint16),
+        ('stx_ino', ctypes.c_uint64),
+        ('stx_size', ctypes.c_uint64),
+        ('stx_blocks', ctypes.c_uint64),
+        ('stx_attributes_mask', ctypes.c_uint64),
+        ('stx_atime', _Timestamp),
+        ('stx_btime', _Timestamp),
+        ('stx_ctime', _Timestamp),
+        ('stx_mtime', _Timestamp),
+        ('stx_rdev_major', ctypes.c_uint32),
+        ('stx_rdev_minor', ctypes.c_uint32),
+        ('stx_dev_major', ctypes.c_uint32),
+        ('stx_dev_minor', ctypes.c_uint32),
+        ('spare', ctypes.c_uint8 * 112),
+    ]
+
+
+# The os.stat_result fields the walker uses, plus st_birthtime (None when
+# the filesystem doesn't record one)
+StatxResult = namedtuple('StatxResult', ['st_mode', 'st_size', 'st_mtime', 'st_mtime_ns', 'st_atime', 'st_ctime',
+                                         'st_ino', 'st_dev', 'st_nlink', 'st_blocks', 'st_birthtime'])
+
+
+def _load():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        func = libc.statx
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.POINTER(_Statx)]
+    func.restype = ctypes.c_int
+    return func
+
+
+_statx = _load()
+HAVE_STATX = _statx is not None
+
+
+def _seconds(ts):
+    return ts.tv_sec + ts.tv_nsec / 1e9
+
+
+def statx(path):
+    # Like os.lstat(path) (doesn't follow symlinks), birth time included
+    buf = _Statx()
+    if _statx(AT_FDCWD, os.fsencode(path), AT_SYMLINK_NOFOLLOW, STATX_BASIC_STATS | STATX_BTIME, ctypes.byref(buf)) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), path)
+    mtime = buf.stx_mtime
+    return StatxResult(
+        buf.stx_mode, buf.stx_size, _seconds(mtime), mtime.tv_sec * 10**9 + mtime.tv_nsec,
+        _seconds(buf.stx_atime), _seconds(buf.stx_ctime),
+        buf.stx_ino, os.makedev(buf.stx_dev_major, buf.stx_dev_minor), buf.stx_nlink, buf.stx_blocks,
+        # some filesystems fill in the mask but leave the time at 0
+        _seconds(buf.stx_btime) if buf.stx_mask & STATX_BTIME and buf.stx_btime.tv_sec else None,
+    )
@@ -2,13 +2,32 @@ import os
 import hashlib
 import time
 import json
+import mmap
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Dict, Any
 from datetime import datetime
 
 from display import format_size
+from resultstore import FLAG_GHOST, FLAG_LARGE, FLAG_OLD, heaviest_dirs
 
 BUFFER_READ_LIMIT = 8 * 1024 * 1024
 
+# Per-device read buffer sizes {st_dev: bytes}, anything else uses
+# BUFFER_READ_LIMIT. Fast local NVMe and a high latency NFS mount rarely
+# want the same size - see set_buffer_size()
+BUFFER_SIZES = {}
+
+# Files at least this big are hashed through mmap instead of read calls
+# (None = never). Saves the kernel -> user copy, but the mapped pages show
+# up in RSS while the file is hashed, so it's opt-in.
+MMAP_MIN_SIZE = None
+
+# One reusable read buffer per hashing thread
+_thread_buffers = threading.local()
+
 def get_file_size(path):
     return os.path.getsize(path)
 
@@ -18,36 +37,224 @@ def get_file_age(path):
     return time.time() - last_modified
 
 
-def hash_file(path, algorithm='md5'):
-    hash_algorithms = {
-        'md5': hashlib.md5,
-        'sha1': hashlib.sha1,
-        'sha256': hashlib.sha256
-    }
-    
-    if algorithm not in hash_algorithms:
-        raise ValueError(f"Unsupported hash algorithm: {algorithm}. Supported algorithms are: {', '.join(hash_algorithms.keys())}")
-    
-    hasher = hash_algorithms[algorithm]()
+HASH_ALGORITHMS = {
+    'md5': hashlib.md5,
+    'sha1': hashlib.sha1,
+    'sha256': hashlib.sha256,
+    'blake2b': hashlib.blake2b,
+    'blake2s': hashlib.blake2s
+}
+
+# xxhash is optional - way faster than anything in hashlib, but not
+# cryptographic, which is fine for spotting duplicates
+try:
+    import xxhash
+    HASH_ALGORITHMS['xxh64'] = xxhash.xxh64
+    HASH_ALGORITHMS['xxh3_128'] = xxhash.xxh3_128
+except ImportError:
+    xxhash = None
+
+# How much of the head and tail of a file the partial hash looks at
+PARTIAL_HASH_SIZE = 4 * 1024
+
+# Result of the 'auto' benchmark, only run once per process
+_fastest_algorithm = None
+
+# 'auto' only picks from digests at least this many bytes long: duplicate
+# groups go straight to --delete with no byte comparison, so a 64-bit
+# hash (xxh64) collides far too easily for that
+AUTO_MIN_DIGEST_SIZE = 16
+
+
+def get_hasher(algorithm='md5'):
+    if algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"Unsupported hash algorithm: {algorithm}. Supported algorithms are: {', '.join(HASH_ALGORITHMS.keys())}")
+    return HASH_ALGORITHMS[algorithm]()
+
+
+def benchmark_hash_algorithms(sample_size=1024 * 1024, rounds=8, names=None):
+    # Throughput of every available algorithm (or just `names`) on this
+    # CPU, in bytes/second
+    sample = os.urandom(sample_size)
+    speeds = {}
+    for name in names or HASH_ALGORITHMS:
+        factory = HASH_ALGORITHMS[name]
+        hasher = factory()
+        hasher.update(sample)  # warm up
+        start = time.perf_counter()
+        for _ in range(rounds):
+            hasher.update(sample)
+        hasher.hexdigest()
+        speeds[name] = sample_size * rounds / max(time.perf_counter() - start, 1e-9)
+    return speeds
+
+
+def resolve_hash_algorithm(algorithm):
+    # 'auto' becomes whatever hashes fastest here, out of the algorithms
+    # with at least AUTO_MIN_DIGEST_SIZE byte digests; anything else is
+    # passed through. Callers store the resolved name next to the hashes.
+    global _fastest_algorithm
+    if algorithm != 'auto':
+        return algorithm
+    if _fastest_algorithm is None:
+        names = [name for name, factory in HASH_ALGORITHMS.items()
+                 if factory().digest_size >= AUTO_MIN_DIGEST_SIZE]
+        speeds = benchmark_hash_algorithms(names=names)
+        _fastest_algorithm = max(speeds, key=speeds.get)
+    return _fastest_algorithm
+
+
+def set_buffer_size(size, path=None):
+    # Sets the hash read buffer for the device `path` lives on, or the
+    # default for every device when no path is given
+    global BUFFER_READ_LIMIT
+    if size < 1:
+        # a 0 byte buffer reads nothing, every file would hash as empty
+        raise ValueError(f"buffer size must be at least 1 byte, got {size}")
+    if path is None:
+        BUFFER_READ_LIMIT = size
+    else:
+        BUFFER_SIZES[os.stat(path).st_dev] = size
+
+
+def _read_buffer(size, at_least=False):
+    # Hands out this thread's buffer as a memoryview, (re)allocating it only
+    # when a different size is asked for, so hashing a multi-GB file doesn't
+    # create a new bytes object for every read
+    view = getattr(_thread_buffers, 'view', None)
+    if view is None or (len(view) < size if at_least else len(view) != size):
+        view = memoryview(bytearray(size))
+        _thread_buffers.view = view
+    return view
+
+
+def _readinto_full(f, view):
+    # readinto() on a raw file may return short reads, keep going until the
+    # view is full or we hit EOF
+    total = 0
+    while total < len(view):
+        n = f.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
+
+
+def _hash_open_file(f, hasher, size, buffer_size):
+    if MMAP_MIN_SIZE is not None and size is not None and size >= MMAP_MIN_SIZE:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mm)
+            try:
+                for offset in range(0, len(mm), buffer_size):
+                    hasher.update(view[offset:offset + buffer_size])
+            finally:
+                view.release()
+        return
+
+    view = _read_buffer(buffer_size)
+    while True:
+        n = f.readinto(view)
+        if not n:
+            break
+        hasher.update(view[:n])
+
+
+def hash_file(path, algorithm='md5', cache=None, key=None):
+    # key is (st_dev, st_ino, st_size, st_mtime_ns); with a cache the file
+    # is only opened when no valid hash is stored for it yet
+    if cache is not None and key is not None:
+        cached = cache.get(key, algorithm)
+        if cached is not None:
+            return cached
+
+    hasher = get_hasher(algorithm)
     
     try:
-        with open(path, 'rb') as f:
-            buf = f.read(BUFFER_READ_LIMIT)
-            while buf:
-                hasher.update(buf)
-                buf = f.read(BUFFER_READ_LIMIT)
-        return hasher.hexdigest()
+        # unbuffered: readinto() goes straight from the kernel into our buffer
+        with open(path, 'rb', buffering=0) as f:
+            if key is not None:
+                dev, size = key[0], key[2]
+            else:
+                st = os.fstat(f.fileno())
+                dev, size = st.st_dev, st.st_size
+            _hash_open_file(f, hasher, size, BUFFER_SIZES.get(dev, BUFFER_READ_LIMIT))
+        digest = hasher.hexdigest()
     except Exception as e:
         raise Exception(f"Error calculating hash for {path}: {str(e)}")
 
+    if cache is not None and key is not None:
+        cache.put(key, algorithm, digest)
+    return digest
+
+
+def hash_file_partial(path, size, algorithm='md5', chunk_size=PARTIAL_HASH_SIZE, cache=None, key=None):
+    # Files small enough to be covered by head + tail are hashed whole,
+    # so the result is the same as hash_file() and no full pass is needed
+    if size <= 2 * chunk_size:
+        return hash_file(path, algorithm, cache=cache, key=key)
+
+    kind = f"partial{chunk_size}"
+    if cache is not None and key is not None:
+        cached = cache.get(key, algorithm, kind)
+        if cached is not None:
+            return cached
+
+    hasher = get_hasher(algorithm)
+    try:
+        view = _read_buffer(chunk_size, at_least=True)[:chunk_size]
+        with open(path, 'rb', buffering=0) as f:
+            hasher.update(view[:_readinto_full(f, view)])
+            f.seek(size - chunk_size)
+            hasher.update(view[:_readinto_full(f, view)])
+        digest = hasher.hexdigest()
+    except Exception as e:
+        raise Exception(f"Error calculating partial hash for {path}: {str(e)}")
+
+    if cache is not None and key is not None:
+        cache.put(key, algorithm, digest, kind)
+    return digest
+
+
+def _collect(item, future):
+    try:
+        return item, future.result(), None
+    except Exception as e:
+        return item, None, e
+
+
+def map_bounded(func, items, workers=1, queue_depth=None):
+    # Ordered parallel map for I/O heavy work like hashing (file reads and
+    # hashlib both release the GIL). Yields (item, result, error) in input
+    # order and never has more than queue_depth jobs in flight, so memory
+    # stays flat no matter how many items come in.
+    if workers <= 1:
+        for item in items:
+            try:
+                yield item, func(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    queue_depth = queue_depth or workers * 2
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for item in items:
+            pending.append((item, pool.submit(func, item)))
+            if len(pending) >= queue_depth:
+                yield _collect(*pending.popleft())
+        while pending:
+            yield _collect(*pending.popleft())
+
 
 def results_to_list(results, show_both_duplicates=False, kind=False):
     out = []
+    views = [("ghost", results['ghosts']), ("large", results['large']), ("old", results['old'])]
 
     if kind:
-        out.extend([("ghost", g) for g in results['ghosts']])
-        out.extend([("large", f[0]) for f in results['large']])
-        out.extend([("old", f[0]) for f in results['old']])
+        for item_kind, entries in views:
+            out.extend((item_kind, entry[0]) for entry in entries)
         if show_both_duplicates == False:
             out.extend([("duplicate", item[1][0]) for item in results['duplicates'].items()])
         else:
@@ -55,9 +262,13 @@ def results_to_list(results, show_both_duplicates=False, kind=False):
                 for item in dup:
                     out.append(("duplicate", item))
     else:
-        out.extend(results['ghosts'])
-        out.extend([f[0] for f in results['large']])
-        out.extend([f[0] for f in results['old']])
+        store = getattr(results['ghosts'], 'store', None)
+        if store is not None:
+            # column store results: dedup on row numbers instead of strings
+            out.extend(store.unique_paths([entries for _, entries in views]))
+        else:
+            for _, entries in views:
+                out.extend(entry[0] for entry in entries)
         if show_both_duplicates == False:
             out.extend([item[1][0] for item in results['duplicates'].items()])
         else:
@@ -65,7 +276,17 @@ def results_to_list(results, show_both_duplicates=False, kind=False):
                 for item in dup:
                     out.append(item)
 
-    return list(set(out))
+    # dict keeps the first occurrence of each item, so the order is stable
+    return list(dict.fromkeys(out))
+
+EXPORT_FORMATS = ("txt", "json", "md", "ndjson", "sqlite")
+
+# How many of the heaviest directories the txt / json / md reports list
+# (ndjson and sqlite get all of them)
+EXPORT_TOP_DIRS = 20
+
+# Same for extensions in the stats section (sqlite gets all of them)
+EXPORT_TOP_EXTENSIONS = 20
 
 def export_results(results: Dict[str, Any], format_type: str, output_path: str = None):
     if output_path is None:
@@ -78,6 +299,10 @@ def export_results(results: Dict[str, Any], format_type: str, output_path: str =
         return export_json(results, output_path)
     elif format_type == "md":
         return export_markdown(results, output_path)
+    elif format_type == "ndjson":
+        return export_ndjson(results, output_path)
+    elif format_type == "sqlite":
+        return export_sqlite(results, output_path)
     else:
         raise ValueError(f"Unsupported format: {format_type}")
 
@@ -95,6 +320,11 @@ def export_txt(results: Dict[str, Any], output_path: str) -> str:
             f.write(f"Path: {path}\n")
             f.write(f"Size: {format_size(size)}\n")
             f.write(f"Age: {age // (24*3600)} days\n\n")
+        if results.get("ghost_rules"):
+            f.write("Rule hits:\n")
+            for rule, files, nbytes in results["ghost_rules"]:
+                f.write(f"  {rule}: {files} files, {format_size(nbytes)}\n")
+            f.write("\n")
         
         # Large Files
         f.write("💾 Large Files:\n")
@@ -106,6 +336,8 @@ def export_txt(results: Dict[str, Any], output_path: str) -> str:
         # Old Files
         f.write("⌛ Old Files:\n")
         f.write("-" * 30 + "\n")
+        if results.get("old_time"):
+            f.write(f"Age by: {results['old_time']}\n\n")
         for path, age in results["old"]:
             f.write(f"Path: {path}\n")
             f.write(f"Age: {age // (24*3600)} days\n\n")
@@ -113,11 +345,46 @@ def export_txt(results: Dict[str, Any], output_path: str) -> str:
         # Duplicates
         f.write("🌀 Duplicate Files:\n")
         f.write("-" * 30 + "\n")
+        if results.get("hash_algo"):
+            f.write(f"Hash algorithm: {results['hash_algo']}\n\n")
         for hash_val, paths in results["duplicates"].items():
             f.write(f"Hash: {hash_val}\n")
             for path in paths:
                 f.write(f"  - {path}\n")
             f.write("\n")
+
+        # Hardlinks
+        f.write("🔗 Hardlinks:\n")
+        f.write("-" * 30 + "\n")
+        for inode, paths in results.get("hardlinks", {}).items():
+            f.write(f"Inode: {inode}\n")
+            for path in paths:
+                f.write(f"  - {path}\n")
+            f.write("\n")
+
+        # Directories
+        f.write("📂 Heaviest Directories:\n")
+        f.write("-" * 30 + "\n")
+        for path, totals in heaviest_dirs(results.get("directories", {}), EXPORT_TOP_DIRS):
+            f.write(f"Path: {path}\n")
+            f.write(f"On disk: {format_size(totals.allocated)} (apparent {format_size(totals.size)})\n")
+            f.write(f"Files: {totals.files}\n\n")
+
+        # Distributions
+        stats = results.get("stats")
+        if stats is not None:
+            f.write("📊 File Sizes:\n")
+            f.write("-" * 30 + "\n")
+            for lo, hi, files, nbytes in stats.size_histogram():
+                f.write(f"{format_size(lo)} - {format_size(hi)}: {files} files, {format_size(nbytes)}\n")
+            f.write("\n🕰️ File Ages:\n")
+            f.write("-" * 30 + "\n")
+            for label, files, nbytes in stats.age_histogram():
+                f.write(f"{label}: {files} files, {format_size(nbytes)}\n")
+            f.write("\n🧩 Extensions:\n")
+            f.write("-" * 30 + "\n")
+            for ext, files, nbytes in stats.top_extensions(EXPORT_TOP_EXTENSIONS):
+                f.write(f"{ext or '(none)'}: {files} files, {format_size(nbytes)}\n")
     
     return output_file
 
@@ -133,6 +400,10 @@ def export_json(results: Dict[str, Any], output_path: str) -> str:
             }
             for path, size, age in results["ghosts"]
         ],
+        "ghost_rules": [
+            {"rule": rule, "files": files, "bytes": nbytes}
+            for rule, files, nbytes in results.get("ghost_rules", [])
+        ],
         "large_files": [
             {
                 "path": path,
@@ -147,10 +418,26 @@ def export_json(results: Dict[str, Any], output_path: str) -> str:
             }
             for path, age in results["old"]
         ],
+        "old_time": results.get("old_time"),
+        "hash_algo": results.get("hash_algo"),
         "duplicates": {
             hash_val: paths
             for hash_val, paths in results["duplicates"].items()
-        }
+        },
+        "hardlinks": {
+            inode: paths
+            for inode, paths in results.get("hardlinks", {}).items()
+        },
+        "heaviest_directories": [
+            {
+                "path": path,
+                "size": totals.size,
+                "allocated": totals.allocated,
+                "files": totals.files
+            }
+            for path, totals in heaviest_dirs(results.get("directories", {}), EXPORT_TOP_DIRS)
+        ],
+        "stats": results["stats"].as_dict(EXPORT_TOP_EXTENSIONS) if results.get("stats") else None
     }
     
     with open(output_file, 'w') as f:
@@ -158,6 +445,228 @@ def export_json(results: Dict[str, Any], output_path: str) -> str:
     
     return output_file
 
+class NdjsonWriter:
+    # Writes findings as newline-delimited JSON, one object per line, as
+    # they come in - nothing is held in memory, so it can be fed straight
+    # from iter_scan() / scan_all(on_finding=...) and read by another tool
+    # while the scan is still running. First line is a {"type": "scan"}
+    # header, then one of:
+    #   {"type": "ghost", "path", "size", "age_days"}
+    #   {"type": "large", "path", "size"}
+    #   {"type": "old", "path", "age_days"}
+    #   {"type": "duplicate", "hash", "paths"}
+    #   {"type": "hardlink", "inode", "paths"}
+    #   {"type": "directory", "path", "size", "allocated", "files"} (all of them)
+    #   {"type": "stats", "size_histogram", "age_histogram", "extensions"}
+    #   {"type": "ghost_rules", "rules": [{"rule", "files", "bytes"}]}
+    FLUSH_INTERVAL = 1.0  # seconds; readers see new lines at least this often
+
+    def __init__(self, output_file, root=None, hash_algo=None, old_time=None):
+        # old_time: the timestamp the old files' age_days go by
+        self.output_file = output_file
+        self.f = open(output_file, 'w', encoding='utf-8')
+        self.last_flush = time.monotonic()
+        self._write_line({
+            "type": "scan",
+            "root": root,
+            "hash_algo": hash_algo,
+            "old_time": old_time,
+            "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+
+    def _write_line(self, obj):
+        self.f.write(json.dumps(obj) + "\n")
+        now = time.monotonic()
+        if now - self.last_flush >= self.FLUSH_INTERVAL:
+            self.f.flush()
+            self.last_flush = now
+
+    def write(self, kind, data):
+        if kind == "ghost":
+            path, size, age = data
+            self._write_line({"type": kind, "path": path, "size": size, "age_days": age // (24*3600)})
+        elif kind == "large":
+            path, size = data
+            self._write_line({"type": kind, "path": path, "size": size})
+        elif kind == "old":
+            path, age = data
+            self._write_line({"type": kind, "path": path, "age_days": age // (24*3600)})
+        elif kind == "duplicate":
+            file_hash, paths = data
+            self._write_line({"type": kind, "hash": file_hash, "paths": paths})
+        elif kind == "hardlink":
+            inode, paths = data
+            self._write_line({"type": kind, "inode": inode, "paths": paths})
+        elif kind == "directory":
+            path, totals = data
+            self._write_line({"type": kind, "path": path, "size": totals.size,
+                              "allocated": totals.allocated, "files": totals.files})
+        elif kind == "stats":
+            self._write_line({"type": kind, **data.as_dict(EXPORT_TOP_EXTENSIONS)})
+        elif kind == "ghost_rules":
+            self._write_line({"type": kind, "rules": [{"rule": rule, "files": files, "bytes": nbytes}
+                                                      for rule, files, nbytes in data]})
+
+    def write_finding(self, finding):
+        self.write(finding.kind, finding.data)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def export_ndjson(results: Dict[str, Any], output_path: str) -> str:
+    # Same lines NdjsonWriter streams during a scan, from finished results
+    output_file = f"{output_path}.ndjson"
+
+    with NdjsonWriter(output_file, hash_algo=results.get("hash_algo"), old_time=results.get("old_time")) as writer:
+        for kind, key in (("ghost", "ghosts"), ("large", "large"), ("old", "old")):
+            for entry in results[key]:
+                writer.write(kind, entry)
+        for path, totals in results.get("directories", {}).items():
+            writer.write("directory", (path, totals))
+        if results.get("stats") is not None:
+            writer.write("stats", results["stats"])
+        if results.get("ghost_rules"):
+            writer.write("ghost_rules", results["ghost_rules"])
+        for inode, paths in results.get("hardlinks", {}).items():
+            writer.write("hardlink", (inode, paths))
+        for hash_val, paths in results["duplicates"].items():
+            writer.write("duplicate", (hash_val, paths))
+
+    return output_file
+
+SQLITE_SCHEMA = """
+CREATE TABLE scan (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE files (
+    path TEXT NOT NULL,
+    dir TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    old_time REAL,          -- the timestamp the old scan went by (the scan's old_time
+                            -- field), NULL unless is_old
+    is_ghost INTEGER NOT NULL,
+    is_large INTEGER NOT NULL,
+    is_old INTEGER NOT NULL
+);
+CREATE TABLE duplicates (hash TEXT NOT NULL, path TEXT NOT NULL);
+CREATE TABLE hardlinks (inode TEXT NOT NULL, path TEXT NOT NULL);
+CREATE TABLE directories (      -- totals of everything under each directory
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    allocated INTEGER NOT NULL,
+    files INTEGER NOT NULL
+);
+-- distributions over every walked file, not just the reported ones
+CREATE TABLE size_histogram (min INTEGER, max INTEGER, files INTEGER, bytes INTEGER);
+CREATE TABLE age_histogram (age TEXT, files INTEGER, bytes INTEGER);
+CREATE TABLE extensions (extension TEXT PRIMARY KEY, files INTEGER, bytes INTEGER);
+CREATE TABLE ghost_rules (rule TEXT PRIMARY KEY, files INTEGER, bytes INTEGER);
+"""
+
+# Built after the bulk insert - much cheaper than keeping them up to date row by row
+SQLITE_INDEXES = """
+CREATE INDEX files_size ON files (size);
+CREATE INDEX files_mtime ON files (mtime);
+CREATE INDEX files_extension ON files (extension);
+CREATE INDEX files_dir ON files (dir);
+CREATE INDEX duplicates_hash ON duplicates (hash);
+CREATE INDEX duplicates_path ON duplicates (path);
+CREATE INDEX directories_allocated ON directories (allocated);
+"""
+
+def _sqlite_file_rows(results, scanned_at):
+    # Rows for the files table, each reported file once
+    def row(path, parent, name, size, mtime, old_age, flags):
+        dot = name.rfind('.')
+        return (path, parent, name[dot:].lower() if dot > 0 else '', size, mtime,
+                scanned_at - old_age if old_age is not None else None,
+                bool(flags & FLAG_GHOST), bool(flags & FLAG_LARGE), bool(flags & FLAG_OLD))
+
+    store = getattr(results['ghosts'], 'store', None)
+    if store is not None:
+        # the store already has paths split into an interned directory and
+        # a basename, no need to split millions of strings again
+        dirs = store.dirs
+        parents = [prefix[:-1] if len(prefix) > 1 else prefix for prefix in dirs]
+        for dir_id, name, size, mtime, old_age, flags in store.iter_rows():
+            yield row(dirs[dir_id] + name, parents[dir_id], name, size, mtime, old_age, flags)
+        return
+
+    # plain lists of findings: only what the tuples themselves say, so a
+    # file only the large scan reported has no mtime here
+    merged = {}
+    for flag, key in ((FLAG_GHOST, "ghosts"), (FLAG_LARGE, "large"), (FLAG_OLD, "old")):
+        for entry in results[key]:
+            size, mtime, old_age, flags = merged.get(entry[0], (None, None, None, 0))
+            if key == "ghosts":
+                size, mtime = entry[1], scanned_at - entry[2]
+            elif key == "large":
+                size = entry[1]
+            else:
+                old_age = entry[1]
+            merged[entry[0]] = (size, mtime, old_age, flags | flag)
+    for path, (size, mtime, old_age, flags) in merged.items():
+        parent, name = os.path.split(path)
+        yield row(path, parent, name, size, mtime, old_age, flags)
+
+def export_sqlite(results: Dict[str, Any], output_path: str) -> str:
+    # One indexed table per kind of finding, for ad-hoc queries like
+    #   SELECT path, size FROM files WHERE dir LIKE '/var/%'
+    #     AND mtime < strftime('%s', 'now', '-1 year') ORDER BY size DESC
+    output_file = f"{output_path}.sqlite"
+    if os.path.exists(output_file):
+        os.remove(output_file)
+
+    scanned_at = results.get("scanned_at") or time.time()
+
+    conn = sqlite3.connect(output_file)
+    try:
+        # a fresh file nobody else reads yet - no journal needed, and one
+        # transaction for everything
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SQLITE_SCHEMA)
+        with conn:
+            conn.executemany("INSERT INTO scan VALUES (?, ?)", [
+                ("generated", datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                ("scanned_at", str(scanned_at)),
+                ("hash_algo", results.get("hash_algo")),
+                ("old_time", results.get("old_time")),
+            ])
+            conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", _sqlite_file_rows(results, scanned_at))
+            conn.executemany("INSERT INTO duplicates VALUES (?, ?)", (
+                (hash_val, path)
+                for hash_val, paths in results["duplicates"].items()
+                for path in paths
+            ))
+            conn.executemany("INSERT INTO hardlinks VALUES (?, ?)", (
+                (inode, path)
+                for inode, paths in results.get("hardlinks", {}).items()
+                for path in paths
+            ))
+            conn.executemany("INSERT INTO directories VALUES (?, ?, ?, ?)", (
+                (path, totals.size, totals.allocated, totals.files)
+                for path, totals in results.get("directories", {}).items()
+            ))
+            stats = results.get("stats")
+            if stats is not None:
+                conn.executemany("INSERT INTO size_histogram VALUES (?, ?, ?, ?)", stats.size_histogram())
+                conn.executemany("INSERT INTO age_histogram VALUES (?, ?, ?)", stats.age_histogram())
+                conn.executemany("INSERT INTO extensions VALUES (?, ?, ?)",
+                                 stats.top_extensions(len(stats.extensions)))
+            conn.executemany("INSERT INTO ghost_rules VALUES (?, ?, ?)", results.get("ghost_rules", []))
+        conn.executescript(SQLITE_INDEXES)
+    finally:
+        conn.close()
+
+    return output_file
+
 def export_markdown(results: Dict[str, Any], output_path: str) -> str:
     output_file = f"{output_path}.md"
     
@@ -172,6 +681,11 @@ def export_markdown(results: Dict[str, Any], output_path: str) -> str:
             f.write("|------|------|-----|\n")
             for path, size, age in results["ghosts"]:
                 f.write(f"| `{path}` | {format_size(size)} | {age // (24*3600)} days |\n")
+            if results.get("ghost_rules"):
+                f.write("\n| Rule | Files | Size |\n")
+                f.write("|------|-------|------|\n")
+                for rule, files, nbytes in results["ghost_rules"]:
+                    f.write(f"| `{rule}` | {files} | {format_size(nbytes)} |\n")
         else:
             f.write("No ghost files found.\n")
         f.write("\n")
@@ -190,6 +704,8 @@ def export_markdown(results: Dict[str, Any], output_path: str) -> str:
         # Old Files
         f.write("## ⌛ Old Files\n\n")
         if results["old"]:
+            if results.get("old_time"):
+                f.write(f"Age by: `{results['old_time']}`\n\n")
             f.write("| Path | Age |\n")
             f.write("|------|-----|\n")
             for path, age in results["old"]:
@@ -201,6 +717,8 @@ def export_markdown(results: Dict[str, Any], output_path: str) -> str:
         # Duplicates
         f.write("## 🌀 Duplicate Files\n\n")
         if results["duplicates"]:
+            if results.get("hash_algo"):
+                f.write(f"Hash algorithm: `{results['hash_algo']}`\n\n")
             for hash_val, paths in results["duplicates"].items():
                 f.write(f"### Hash: `{hash_val}`\n\n")
                 for path in paths:
@@ -208,5 +726,47 @@ def export_markdown(results: Dict[str, Any], output_path: str) -> str:
                 f.write("\n")
         else:
             f.write("No duplicate files found.\n")
+        f.write("\n")
+
+        # Hardlinks
+        f.write("## 🔗 Hardlinks\n\n")
+        if results.get("hardlinks"):
+            for inode, paths in results["hardlinks"].items():
+                f.write(f"### Inode: `{inode}`\n\n")
+                for path in paths:
+                    f.write(f"- `{path}`\n")
+                f.write("\n")
+        else:
+            f.write("No hardlinked files found.\n")
+        f.write("\n")
+
+        # Directories
+        f.write("## 📂 Heaviest Directories\n\n")
+        heaviest = heaviest_dirs(results.get("directories", {}), EXPORT_TOP_DIRS)
+        if heaviest:
+            f.write("| Path | On disk | Apparent | Files |\n")
+            f.write("|------|---------|----------|-------|\n")
+            for path, totals in heaviest:
+                f.write(f"| `{path}` | {format_size(totals.allocated)} | {format_size(totals.size)} | {totals.files} |\n")
+        else:
+            f.write("No directories scanned.\n")
+
+        stats = results.get("stats")
+        if stats is not None:
+            f.write("\n## 📊 File Sizes\n\n")
+            f.write("| Size | Files | Total |\n")
+            f.write("|------|-------|-------|\n")
+            for lo, hi, files, nbytes in stats.size_histogram():
+                f.write(f"| {format_size(lo)} - {format_size(hi)} | {files} | {format_size(nbytes)} |\n")
+            f.write("\n## 🕰️ File Ages\n\n")
+            f.write("| Modified | Files | Total |\n")
+            f.write("|----------|-------|-------|\n")
+            for label, files, nbytes in stats.age_histogram():
+                f.write(f"| {label} | {files} | {format_size(nbytes)} |\n")
+            f.write("\n## 🧩 Extensions\n\n")
+            f.write("| Extension | Files | Total |\n")
+            f.write("|-----------|-------|-------|\n")
+            for ext, files, nbytes in stats.top_extensions(EXPORT_TOP_EXTENSIONS):
+                f.write(f"| `{ext or '(none)'}` | {files} | {format_size(nbytes)} |\n")
     
-    return output_file
\ No newline at end of file
+    return output_file